@@ -1,4 +1,8 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
 
 import jwt
 from fastapi import Depends, HTTPException, status
@@ -7,9 +11,18 @@ from passlib.context import CryptContext
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import ALGORITHM, SECRET_KEY
+from app.cache import LRUTTLCache
+from app.config import (
+    ALGORITHM,
+    PASSWORD_HASH_QUEUE_SIZE,
+    PASSWORD_HASH_WORKERS,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL,
+    SECRET_KEY,
+)
 from app.db_depends import get_async_db
 from app.models.users import User as UserModel
+from app.request_logging import set_log_user
 from app.schemas import User
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -18,6 +31,23 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+# Кэш пользователей по ID, чтобы не ходить в базу на каждый запрос.
+# У каждого процесса свой: смена роли или блокировка доходит до других
+# воркеров не позже чем через PRINCIPAL_CACHE_TTL секунд
+principal_cache = LRUTTLCache(
+    maxsize=PRINCIPAL_CACHE_SIZE,
+    ttl=PRINCIPAL_CACHE_TTL,
+)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Сбрасывает закэшированного пользователя после смены роли/статуса.
+
+    Сбрасывает только кэш этого процесса: в остальных воркерах старая
+    роль или активность действует ещё до PRINCIPAL_CACHE_TTL секунд.
+    """
+    principal_cache.delete(user_id)
+
 
 def hash_password(password: str) -> str:
     """Преобразует пароль в хеш с использованием bcrypt."""
@@ -29,29 +59,123 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# bcrypt отпускает GIL, поэтому потоков достаточно, чтобы не блокировать
+# event loop на время хеширования
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_pending_password_jobs = 0
+
+
+async def _run_password_job(func: Callable[..., Any], *args: str) -> Any:
+    """Выполняет bcrypt в пуле потоков с ограничением очереди."""
+    global _pending_password_jobs
+    if _pending_password_jobs >= (
+        PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _pending_password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """Хеширует пароль в пуле потоков, не блокируя event loop."""
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(
+        plain_password: str,
+        hashed_password: str
+        ) -> bool:
+    """Проверяет пароль в пуле потоков, не блокируя event loop."""
+    return await _run_password_job(
+        verify_password,
+        plain_password,
+        hashed_password,
+    )
+
+
 def create_access_token(data: dict) -> str:
-    """Создаёт JWT с payload (sub, role, id, exp)."""
+    """Создаёт JWT с payload (sub, role, id, type, exp)."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(
         minutes=ACCESS_TOKEN_EXPIRE_MINUTES
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "access"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def create_refresh_token(data: dict) -> str:
-    """Создаёт рефреш-токен с длительным сроком действия."""
+    """Создаёт рефреш-токен с длительным сроком действия.
+
+    jti - уникальный ID токена, по нему токен отзывается.
+    """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(
         days=REFRESH_TOKEN_EXPIRE_DAYS
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({
+        "exp": expire,
+        "type": "refresh",
+        "jti": os.urandom(16).hex(),
+    })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def decode_refresh_token(token: str) -> dict:
+    """Проверяет refresh-токен и возвращает его payload.
+
+    Токен должен быть подписан, не истёк, иметь тип refresh и содержать
+    sub, id и jti; иначе - 401.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise credentials_exception
+    if payload.get("type") != "refresh" or not all(
+        payload.get(claim) for claim in ("sub", "id", "jti")
+    ):
+        raise credentials_exception
+    return payload
+
+
+async def load_principal(
+    db: AsyncSession,
+    email: str,
+    user_id: int | None,
+) -> User | None:
+    """Активный пользователь из кэша по ID или из базы по email."""
+    if user_id is not None:
+        user = principal_cache.get(user_id)
+        if user is not None and user.email == email:
+            return user
+    result = await db.scalars(
+        select(UserModel).where(UserModel.email == email, UserModel.is_active))
+    db_user = result.first()
+    if db_user is None:
+        return None
+    user = User.model_validate(db_user)
+    principal_cache.set(user.id, user)
+    return user
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme),
                            db: AsyncSession = Depends(get_async_db)) -> User:
-    """Проверяет JWT и возвращает пользователя из базы."""
+    """Проверяет JWT и возвращает пользователя из кэша или из базы."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,7 +184,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        user_id: int | None = payload.get("id")
+        # Годится только access-токен: не refresh и не токен без типа
+        if email is None or payload.get("type") != "access":
             raise credentials_exception
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -70,11 +196,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         )
     except jwt.PyJWTError:
         raise credentials_exception
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == email, UserModel.is_active))
-    user = result.first()
+    user = await load_principal(db, email, user_id)
     if user is None:
         raise credentials_exception
+    set_log_user(user.id)
     return user
 
 
@@ -0,0 +1,271 @@
+import codecs
+import csv
+import json
+from collections import deque
+from typing import Any, AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import upsert_insert
+from app.models import Category as CategoryModel
+from app.models import Product as ProductModel
+from app.schemas import (
+    ProductImportError,
+    ProductImportReport,
+    ProductImportRow,
+)
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Предел записи: память на разбор не зависит от присланных данных
+MAX_RECORD_SIZE = 64 * 1024
+MAX_RECORD_LINES = 100
+
+# Колонки, которые перезаписываются при повторном импорте того же артикула
+UPSERT_COLUMNS = (
+    "name", "description", "price", "image_url", "stock", "category_id",
+    "is_active",
+)
+
+
+class _Incomplete(Exception):
+    """Строки записи CSV кончились посреди поля в кавычках."""
+
+
+class _RecordLines:
+    """Источник строк для csv.reader: строки текущей записи CSV.
+
+    Когда строки кончаются, а csv.reader ждёт продолжения поля в
+    кавычках, бросает _Incomplete вместо конца данных.
+    """
+
+    def __init__(self) -> None:
+        """Создаёт пустой источник."""
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_RecordLines":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise _Incomplete
+        return self.lines.popleft()
+
+
+def _too_long() -> ValueError:
+    return ValueError(f"Row is longer than {MAX_RECORD_SIZE} characters")
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[str | ValueError]:
+    """Разбивает поток байтов на строки UTF-8, не читая его целиком.
+
+    Строка длиннее MAX_RECORD_SIZE не накапливается: вместо неё
+    выдаётся ошибка, а остаток строки пропускается.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    skipping = False
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > MAX_RECORD_SIZE:
+                yield _too_long()
+            else:
+                yield line.rstrip("\r")
+        if len(buffer) > MAX_RECORD_SIZE:
+            if not skipping:
+                yield _too_long()
+                skipping = True
+            buffer = ""
+    buffer += decoder.decode(b"", final=True)
+    if buffer and not skipping:
+        yield _too_long() if len(buffer) > MAX_RECORD_SIZE else (
+            buffer.rstrip("\r")
+        )
+
+
+async def iter_ndjson(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[dict | Exception]:
+    """Читает NDJSON: по объекту на строку, пустые строки пропускаются."""
+    async for line in iter_lines(stream):
+        if isinstance(line, Exception):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield exc
+            continue
+        yield row if isinstance(row, dict) else ValueError("Expected object")
+
+
+async def iter_records(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[list[str] | Exception]:
+    """Читает записи CSV; поля в кавычках могут содержать переводы строк.
+
+    Где кончается запись, решает сам csv.reader: строки копятся, пока он
+    не разберёт запись целиком. Запись длиннее MAX_RECORD_SIZE символов
+    или MAX_RECORD_LINES строк - ошибка, и разбор продолжается со
+    следующей строки. Лимит строк ограничивает и повторный разбор.
+    """
+    source = _RecordLines()
+    reader = csv.reader(source)
+    record: list[str] = []
+    size = 0
+    async for line in iter_lines(stream):
+        if isinstance(line, Exception):
+            record, size = [], 0
+            yield line
+            continue
+        if not record and not line.strip():
+            continue
+        # csv.reader сохраняет переводы строк внутри кавычек, только если
+        # они есть в самих строках
+        record.append(line + "\n")
+        size += len(line) + 1
+        if size > MAX_RECORD_SIZE:
+            record, size = [], 0
+            yield _too_long()
+            continue
+        if len(record) > MAX_RECORD_LINES:
+            record, size = [], 0
+            yield ValueError(f"Row spans more than {MAX_RECORD_LINES} lines")
+            continue
+        source.lines = deque(record)
+        try:
+            values = next(reader)
+        except _Incomplete:
+            continue
+        except csv.Error as exc:
+            values = ValueError(str(exc))
+        record, size = [], 0
+        yield values
+    if record:
+        yield ValueError("Unterminated quoted field")
+
+
+async def iter_csv(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[dict | Exception]:
+    """Читает CSV с заголовком, см. iter_records()."""
+    header = None
+    async for values in iter_records(stream):
+        if isinstance(values, Exception):
+            yield values
+        elif header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield ValueError(
+                f"Expected {len(header)} columns, got {len(values)}"
+            )
+        else:
+            yield {
+                name: value if value != "" else None
+                for name, value in zip(header, values)
+            }
+
+
+def _upsert_statement(db: AsyncSession, rows: list[dict]) -> Any:
+    """Многострочный INSERT ... ON CONFLICT по (seller_id, sku)."""
+    stmt = upsert_insert(db.get_bind().dialect.name, ProductModel)
+    stmt = stmt.values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[ProductModel.seller_id, ProductModel.sku],
+        set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS},
+    )
+
+
+class ProductImporter:
+    """Накопитель строк импорта, пишущий их в базу пачками."""
+
+    def __init__(self, db: AsyncSession, seller_id: int) -> None:
+        """Готовит пустой отчёт для импорта товаров продавца."""
+        self.db = db
+        self.seller_id = seller_id
+        self.report = ProductImportReport(
+            processed=0, upserted=0, failed=0, errors=[]
+        )
+        self._chunk: list[tuple[int, ProductImportRow]] = []
+
+    def _fail(self, row: int, sku: str | None, errors: list[str]) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(
+                ProductImportError(row=row, sku=sku, errors=errors)
+            )
+        else:
+            self.report.errors_truncated = True
+
+    async def add(self, data: dict | Exception) -> None:
+        """Проверяет строку и сбрасывает пачку, когда она заполнится."""
+        self.report.processed += 1
+        row_number = self.report.processed
+        if isinstance(data, Exception):
+            self._fail(row_number, None, [str(data)])
+            return
+        try:
+            row = ProductImportRow.model_validate(data)
+        except ValidationError as exc:
+            sku = data.get("sku")
+            self._fail(row_number, None if sku is None else str(sku), [
+                "{}: {}".format(
+                    ".".join(str(part) for part in error["loc"]),
+                    error["msg"],
+                )
+                for error in exc.errors()
+            ])
+            return
+        self._chunk.append((row_number, row))
+        if len(self._chunk) >= IMPORT_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Проверяет категории пачки одним запросом и сохраняет её."""
+        if not self._chunk:
+            return
+        chunk, self._chunk = self._chunk, []
+        active_categories = set(await self.db.scalars(
+            select(CategoryModel.id).where(
+                CategoryModel.id.in_({row.category_id for _, row in chunk}),
+                CategoryModel.is_active,
+            )
+        ))
+        # Повтор артикула в пачке: побеждает последняя строка, иначе
+        # ON CONFLICT затронет одну запись дважды. Вытесненная строка
+        # попадает в отчёт как ошибка
+        rows_by_sku: dict[str, tuple[int, dict]] = {}
+        for row_number, row in chunk:
+            if row.category_id not in active_categories:
+                self._fail(row_number, row.sku, [
+                    "category_id: Category not found or inactive"
+                ])
+                continue
+            previous = rows_by_sku.get(row.sku)
+            if previous is not None:
+                self._fail(previous[0], row.sku, [
+                    f"sku: Superseded by row {row_number}"
+                ])
+            rows_by_sku[row.sku] = (row_number, {
+                **row.model_dump(),
+                "seller_id": self.seller_id,
+                "is_active": True,
+            })
+        if rows_by_sku:
+            await self.db.execute(_upsert_statement(
+                self.db, [values for _, values in rows_by_sku.values()]
+            ))
+            await self.db.commit()
+            self.report.upserted += len(rows_by_sku)
+        # Ошибки категорий находятся позже ошибок проверки следующих строк
+        self.report.errors.sort(key=lambda error: error.row)
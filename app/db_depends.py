@@ -1,11 +1,105 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 
+import jwt
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from app.database import async_session_maker
+from app.cache import LRUTTLCache
+from app.config import (
+    ALGORITHM,
+    READ_YOUR_WRITES_CACHE_SIZE,
+    READ_YOUR_WRITES_SECONDS,
+    SECRET_KEY,
+)
+from app.database import async_session_maker, replica_set
 
+# Ошибки, после которых реплика считается недоступной
+CONNECTION_ERRORS = (InterfaceError, OperationalError, OSError)
 
-async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+# Клиенты, недавно записывавшие в базу, читают с основной базы
+recent_writers = LRUTTLCache(
+    maxsize=READ_YOUR_WRITES_CACHE_SIZE,
+    ttl=READ_YOUR_WRITES_SECONDS,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_commit(session: Session) -> None:
+    session.info["committed"] = True
+
+
+def _client_key(request: Request) -> int | None:
+    """Ключ клиента для окна read-your-writes: ID пользователя из токена.
+
+    ID не меняется при обновлении токена, в отличие от самого токена, и
+    не общий для клиентов за одним NAT, в отличие от IP. Анонимные
+    запросы окна не получают: записывать они не могут.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    user_id = payload.get("id")
+    if payload.get("type") != "access" or not isinstance(user_id, int):
+        return None
+    return user_id
+
+
+async def get_async_db(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
     """Предоставляет асинхронную сессию для работы с базой данных."""
     async with async_session_maker() as session:
         yield session
+        if READ_YOUR_WRITES_SECONDS and session.info.get("committed"):
+            client_key = _client_key(request)
+            if client_key is not None:
+                recent_writers.set(client_key, True)
+
+
+@asynccontextmanager
+async def read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Открывает сессию только для чтения, по возможности на реплике.
+
+    Сессия отдаётся, только когда реплика выдала соединение. Если не
+    выдала, реплика исключается из ротации и пробуется следующая, а
+    после всех - основная база: недоступная реплика не роняет запрос.
+    Основная база берётся и тогда, когда реплик нет или клиент недавно
+    записывал данные.
+    """
+    use_replica = not (
+        READ_YOUR_WRITES_SECONDS and recent_writers.get(_client_key(request))
+    )
+    while use_replica and (choice := replica_set.choose()) is not None:
+        index, session_maker = choice
+        session = session_maker()
+        try:
+            await session.connection()
+        except CONNECTION_ERRORS:
+            await session.close()
+            replica_set.mark_unhealthy(index)
+            continue
+        async with session:
+            try:
+                yield session
+            except CONNECTION_ERRORS:
+                replica_set.mark_unhealthy(index)
+                raise
+        return
+    async with async_session_maker() as session:
+        yield session
+
+
+async def get_async_read_db(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """Предоставляет сессию только для чтения, см. read_session()."""
+    async with read_session(request) as session:
+        yield session
@@ -0,0 +1,49 @@
+from typing import Any, Callable, Mapping
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy.orm import Load, selectinload
+
+
+def expand_param(
+    relations: Mapping[str, Any],
+) -> Callable[..., frozenset[str]]:
+    """Зависимость, разбирающая ?expand=a,b в набор имён связей.
+
+    Неизвестные имена отклоняются с 422, чтобы опечатка не превращалась
+    молча в ответ без раскрытых связей.
+    """
+    names = ", ".join(relations)
+
+    def dependency(
+        expand: str | None = Query(
+            None,
+            description=f"Связи для раскрытия через запятую: {names}",
+        ),
+    ) -> frozenset[str]:
+        if not expand:
+            return frozenset()
+        requested = frozenset(
+            name.strip() for name in expand.split(",") if name.strip()
+        )
+        unknown = requested - relations.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown expand: {', '.join(sorted(unknown))}",
+            )
+        return requested
+
+    return dependency
+
+
+def expand_options(
+    relations: Mapping[str, Any],
+    expand: frozenset[str],
+) -> list[Load]:
+    """Опции загрузки для запрошенных связей.
+
+    selectinload добавляет по одному запросу на связь, сколько бы
+    объектов ни было на странице. Нераскрытые связи не загружаются
+    вовсе: схемы ответа пропускают их (см. ExpandableModel).
+    """
+    return [selectinload(relations[name]) for name in sorted(expand)]
@@ -0,0 +1,202 @@
+from typing import Sequence
+
+from sqlalchemy import (
+    CompoundSelect,
+    Float,
+    Integer,
+    case,
+    cast,
+    func,
+    literal,
+    literal_column,
+    null,
+    select,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Category as CategoryModel
+from app.models import Product as ProductModel
+from app.schemas import (
+    CategoryFacet,
+    PriceFacet,
+    ProductFacets,
+    RatingFacet,
+)
+
+# Больше корзин гистограмма цен не получит: шаг укрупняется до кратного
+MAX_PRICE_BUCKETS = 100
+
+
+def _floor(value: ColumnElement, dialect: str) -> ColumnElement:
+    """Целая часть неотрицательного числа.
+
+    В SQLite floor() есть не во всех сборках, а CAST к INTEGER там
+    отбрасывает дробную часть; в Postgres CAST округляет, нужен floor().
+    """
+    if dialect == "postgresql":
+        value = func.floor(value)
+    return cast(value, Integer)
+
+
+def facet_statement(
+    dialect: str,
+    filters: Sequence[ColumnElement[bool]],
+    price_step: float,
+) -> CompoundSelect:
+    """Все фасеты каталога одним запросом UNION ALL.
+
+    Каждая строка - (facet, bucket, count, path); path заполнен только у
+    счётчиков категорий и нужен для свёртки по предкам в build_facets().
+    Корзина цены считается с шагом price_step * price_scale, где
+    price_scale - наименьший множитель, при котором корзин не больше
+    MAX_PRICE_BUCKETS; он приходит отдельной строкой.
+    """
+    filtered = (
+        select(
+            ProductModel.category_id,
+            ProductModel.price,
+            ProductModel.rating,
+            ProductModel.stock,
+        )
+        .where(ProductModel.is_active, *filters)
+        .cte("filtered")
+    )
+    per_category = (
+        select(filtered.c.category_id, func.count().label("products"))
+        .group_by(filtered.c.category_id)
+        .cte("per_category")
+    )
+    price_scale = func.coalesce(
+        select(
+            _floor(
+                func.max(filtered.c.price)
+                / literal(price_step * MAX_PRICE_BUCKETS, Float),
+                dialect,
+            ) + 1
+        ).scalar_subquery(),
+        1,
+    )
+    price_bucket = _floor(
+        filtered.c.price / (literal(price_step, Float) * price_scale),
+        dialect,
+    )
+    rating_bucket = _floor(filtered.c.rating, dialect)
+    # Литералы, а не параметры: иначе Postgres выведет для CASE тип text
+    in_stock = case(
+        (filtered.c.stock > 0, literal_column("1")),
+        else_=literal_column("0"),
+    )
+    return union_all(
+        select(
+            literal_column("'category'"),
+            per_category.c.category_id,
+            per_category.c.products,
+            CategoryModel.path,
+        ).join(
+            CategoryModel, CategoryModel.id == per_category.c.category_id
+        ),
+        select(
+            literal_column("'price_scale'"),
+            price_scale,
+            literal_column("0"),
+            null(),
+        ),
+        select(
+            literal_column("'price'"), price_bucket, func.count(), null()
+        ).group_by(price_bucket),
+        select(
+            literal_column("'rating'"), rating_bucket, func.count(), null()
+        ).group_by(rating_bucket),
+        select(
+            literal_column("'in_stock'"), in_stock, func.count(), null()
+        ).group_by(in_stock),
+    )
+
+
+def _path_ids(path: str) -> list[int]:
+    """ID категорий материализованного пути: от корня до самой категории."""
+    return [int(part) for part in path.split("/")[:-1]]
+
+
+def build_facets(
+    rows: Sequence[tuple[str, int, int, str | None]],
+    price_step: float,
+    active_ids: set[int],
+) -> ProductFacets:
+    """Раскладывает строки facet_statement по схеме ответа.
+
+    Счётчик категории прибавляется к ней самой и ко всем её предкам по
+    пути; в ответ попадают только категории из active_ids.
+    """
+    direct: dict[int, int] = {}
+    totals: dict[int, int] = {}
+    price_buckets = []
+    ratings = []
+    stock = {0: 0, 1: 0}
+    for facet, bucket, count, path in rows:
+        if facet == "category":
+            direct[bucket] = count
+            for category_id in _path_ids(path):
+                totals[category_id] = totals.get(category_id, 0) + count
+        elif facet == "price_scale":
+            price_step *= bucket
+        elif facet == "price":
+            price_buckets.append((bucket, count))
+        elif facet == "rating":
+            ratings.append(RatingFacet(rating=bucket, count=count))
+        else:
+            stock[bucket] = count
+    return ProductFacets(
+        total=stock[0] + stock[1],
+        in_stock=stock[1],
+        out_of_stock=stock[0],
+        categories=[
+            CategoryFacet(
+                category_id=category_id,
+                count=direct.get(category_id, 0),
+                total=total,
+            )
+            for category_id, total in sorted(totals.items())
+            if category_id in active_ids
+        ],
+        prices=[
+            PriceFacet(
+                min_price=bucket * price_step,
+                max_price=(bucket + 1) * price_step,
+                count=count,
+            )
+            for bucket, count in sorted(price_buckets)
+        ],
+        ratings=sorted(ratings, key=lambda facet: facet.rating),
+    )
+
+
+async def load_facets(
+    db: AsyncSession,
+    filters: Sequence[ColumnElement[bool]],
+    price_step: float,
+) -> ProductFacets:
+    """Считает фасеты: агрегирующий запрос и выборка активных категорий.
+
+    Предки берутся из путей категорий с товарами, а не соединением по
+    LIKE: такое соединение не ложится на индекс и перебирает все пары
+    категорий. Второй запрос - поиск по первичному ключу.
+    """
+    rows = (await db.execute(facet_statement(
+        db.get_bind().dialect.name, filters, price_step
+    ))).all()
+    category_ids = {
+        category_id
+        for facet, _, _, path in rows if facet == "category"
+        for category_id in _path_ids(path)
+    }
+    active_ids = set()
+    if category_ids:
+        active_ids = set(await db.scalars(
+            select(CategoryModel.id)
+            .where(CategoryModel.id.in_(category_ids))
+            .where(CategoryModel.is_active)
+        ))
+    return build_facets(rows, price_step, active_ids)
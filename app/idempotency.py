@@ -0,0 +1,354 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Protocol
+
+from fastapi.responses import JSONResponse, Response
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import LRUTTLCache
+from app.config import (
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_TTL,
+    IDEMPOTENCY_URL,
+)
+from app.metrics import Counter
+from app.redis_backend import RedisBackend
+
+MAX_KEY_LENGTH = 255
+# Сколько держать метку «запрос выполняется» в общем хранилище: дольше
+# любого разумного запроса, но не навсегда, если процесс упал
+IN_FLIGHT_TTL = 60
+
+idempotency_requests_total = Counter(
+    "idempotency_requests_total",
+    "Запросы с Idempotency-Key по результату: new - выполнен, replayed - "
+    "ответ из хранилища, collapsed - дождался такого же запроса, "
+    "in_progress и mismatch - отклонён.",
+    ("result",),
+)
+
+
+@dataclass
+class StoredResponse:
+    """Сохранённый ответ и отпечаток запроса, на который он дан."""
+
+    fingerprint: str
+    status: int
+    media_type: str
+    body: bytes
+
+    def encode(self) -> bytes:
+        """Сериализует ответ для хранилища."""
+        head = f"{self.fingerprint}\n{self.status}\n{self.media_type}\n"
+        return head.encode() + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "StoredResponse":
+        """Восстанавливает ответ, сохранённый через encode()."""
+        fingerprint, status, media_type, body = data.split(b"\n", 3)
+        return cls(
+            fingerprint.decode(), int(status), media_type.decode(), body
+        )
+
+
+class IdempotencyBackend(Protocol):
+    """Хранилище ответов на запросы с Idempotency-Key."""
+
+    async def get(self, key: str) -> StoredResponse | None:
+        """Возвращает сохранённый ответ или None."""
+
+    async def set(
+        self,
+        key: str,
+        response: StoredResponse,
+        ttl: float,
+    ) -> None:
+        """Сохраняет ответ на ttl секунд."""
+
+    async def acquire(self, key: str) -> bool:
+        """Помечает запрос выполняющимся; False - его уже выполняют."""
+
+    async def release(self, key: str) -> None:
+        """Снимает метку, поставленную acquire()."""
+
+
+class MemoryIdempotencyBackend:
+    """Ответы в памяти процесса: LRU с временем жизни.
+
+    Повторы внутри процесса ждут первый запрос в middleware, поэтому
+    метка выполнения здесь не нужна.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Создаёт хранилище на maxsize ответов."""
+        self._responses = LRUTTLCache(maxsize, ttl=0)
+
+    async def get(self, key: str) -> StoredResponse | None:
+        """Возвращает сохранённый ответ или None."""
+        return self._responses.get(key)
+
+    async def set(
+        self,
+        key: str,
+        response: StoredResponse,
+        ttl: float,
+    ) -> None:
+        """Сохраняет ответ на ttl секунд."""
+        self._responses.set(key, response, ttl=ttl)
+
+    async def acquire(self, key: str) -> bool:
+        """Всегда True: вне процесса хранилище не видно."""
+        return True
+
+    async def release(self, key: str) -> None:
+        """Ничего не делает."""
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+class RedisIdempotencyBackend(RedisBackend):
+    """Ответы в Redis или любом сервере с тем же протоколом.
+
+    Общие для всех процессов: метка SET NX не даёт двум процессам
+    выполнить один и тот же запрос. Ошибки соединения не роняют запрос:
+    он выполняется как без ключа.
+    """
+
+    default_prefix = "idempotency"
+
+    async def get(self, key: str) -> StoredResponse | None:
+        """Возвращает сохранённый ответ или None."""
+        try:
+            data = await self.client.get(self._key(key))
+        except self._errors as exc:
+            logger.warning("Idempotency store read failed: {}", exc)
+            return None
+        return None if data is None else StoredResponse.decode(data)
+
+    async def set(
+        self,
+        key: str,
+        response: StoredResponse,
+        ttl: float,
+    ) -> None:
+        """Сохраняет ответ на ttl секунд."""
+        try:
+            await self.client.set(
+                self._key(key), response.encode(), px=int(ttl * 1000)
+            )
+        except self._errors as exc:
+            logger.warning("Idempotency store write failed: {}", exc)
+
+    async def acquire(self, key: str) -> bool:
+        """Помечает запрос выполняющимся; False - его уже выполняют."""
+        try:
+            return bool(await self.client.set(
+                self._key("lock", key), 1, nx=True, ex=IN_FLIGHT_TTL
+            ))
+        except self._errors as exc:
+            logger.warning("Idempotency store lock failed: {}", exc)
+            return True
+
+    async def release(self, key: str) -> None:
+        """Снимает метку, поставленную acquire()."""
+        try:
+            await self.client.delete(self._key("lock", key))
+        except self._errors as exc:
+            logger.warning("Idempotency store unlock failed: {}", exc)
+
+
+def _header(scope: Scope, name: bytes) -> bytes | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _body_receiver(body: bytes) -> Receive:
+    """receive(), заново отдающий уже прочитанное тело запроса."""
+    async def receive() -> Message:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """ASGI-middleware для заголовка Idempotency-Key на POST-маршрутах.
+
+    Успешный (2xx) ответ сохраняется на ttl секунд и отдаётся повторам
+    с тем же ключом без вызова обработчика, с заголовком
+    Idempotent-Replayed. Ключ действует в пределах учётных данных
+    (заголовка Authorization). Повтор, пришедший, пока первый запрос
+    ещё выполняется, ждёт его ответа; в другом процессе - получает 409.
+    Тот же ключ с другим телом запроса - 422. Ошибки не сохраняются,
+    такой запрос можно повторить с тем же ключом.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: tuple[str, ...],
+        backend: IdempotencyBackend | None = None,
+        ttl: float = IDEMPOTENCY_TTL,
+    ) -> None:
+        """Оборачивает ASGI-приложение для POST-запросов на paths."""
+        self.app = app
+        self.paths = frozenset(paths)
+        self.backend = backend
+        self.ttl = ttl
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Выполняет запрос или отдаёт сохранённый ответ."""
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, b"idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": "Invalid Idempotency-Key"}, status_code=400
+            )(scope, receive, send)
+            return
+        body = await _read_body(receive)
+        credentials = hashlib.sha256(
+            _header(scope, b"authorization") or b""
+        ).hexdigest()[:32]
+        key = f"{credentials}:{scope['path']}:{idempotency_key.decode()}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+        backend = self.backend or idempotency_backend
+
+        stored = await backend.get(key)
+        if stored is not None:
+            idempotency_requests_total.inc(("replayed",))
+        # Повторы в этом процессе ждут первый запрос. Если он не удался,
+        # его место занимает первый из ждущих
+        while stored is None and key in self._in_flight:
+            stored = await asyncio.shield(self._in_flight[key])
+            if stored is not None:
+                idempotency_requests_total.inc(("collapsed",))
+        if stored is not None:
+            await self._replay(stored, fingerprint, scope, receive, send)
+            return
+        await self._run_first(backend, key, fingerprint, body, scope, send)
+
+    async def _run_first(
+        self,
+        backend: IdempotencyBackend,
+        key: str,
+        fingerprint: str,
+        body: bytes,
+        scope: Scope,
+        send: Send,
+    ) -> None:
+        """Выполняет первый запрос с ключом, пока повторы ждут его ответа."""
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        stored = None
+        acquired = False
+        try:
+            acquired = await backend.acquire(key)
+            if not acquired:
+                idempotency_requests_total.inc(("in_progress",))
+                await JSONResponse(
+                    {"detail": "Request with this Idempotency-Key is in "
+                               "progress"},
+                    status_code=409,
+                    headers={"Retry-After": "1"},
+                )(scope, _body_receiver(body), send)
+                return
+            idempotency_requests_total.inc(("new",))
+            stored = await self._execute(
+                scope, _body_receiver(body), send, fingerprint
+            )
+            if stored is not None:
+                await backend.set(key, stored, self.ttl)
+        finally:
+            del self._in_flight[key]
+            future.set_result(stored)
+            if acquired:
+                await backend.release(key)
+
+    async def _execute(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        fingerprint: str,
+    ) -> StoredResponse | None:
+        """Выполняет запрос, запоминая успешный ответ."""
+        status_code = 500
+        media_type = ""
+        chunks: list[bytes] = []
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal status_code, media_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                media_type = (
+                    _header(message, b"content-type") or b""
+                ).decode()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+        if not 200 <= status_code < 300:
+            return None
+        return StoredResponse(
+            fingerprint, status_code, media_type, b"".join(chunks)
+        )
+
+    async def _replay(
+        self,
+        stored: StoredResponse,
+        fingerprint: str,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Отдаёт сохранённый ответ, если тело запроса то же."""
+        if stored.fingerprint != fingerprint:
+            idempotency_requests_total.inc(("mismatch",))
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was used with a different "
+                           "request body"},
+                status_code=422,
+            )
+        else:
+            response = Response(
+                stored.body,
+                status_code=stored.status,
+                media_type=stored.media_type or None,
+                headers={"Idempotent-Replayed": "true"},
+            )
+        await response(scope, receive, send)
+
+
+idempotency_backend: IdempotencyBackend = (
+    RedisIdempotencyBackend.from_url(IDEMPOTENCY_URL) if IDEMPOTENCY_URL
+    else MemoryIdempotencyBackend(IDEMPOTENCY_CACHE_SIZE)
+)
@@ -1,50 +1,64 @@
-from uuid import uuid4
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI
 from loguru import logger
 
-from app.routers import categories, products, reviews, users
-
-app = FastAPI(
-    title="FastAPI Интернет-магазин",
-    version="1.0",
+from app.config import WARMUP_CONNECTIONS, WARMUP_ENABLED
+from app.database import async_engine, replica_set
+from app.idempotency import IdempotencyMiddleware
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.request_logging import (
+    RequestLoggingMiddleware,
+    access_log,
+    configure_logging,
 )
+from app.routers import categories, internal, products, reviews, users
+from app.warmup import warm_up
 
-logger.add(
-    "info.log",
-    format="Log: [{extra[log_id]}:{time} - {level} - {message}]",
-    level="INFO",
-    enqueue=True,
-)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Прогревает приложение при старте и освобождает ресурсы при остановке."""
+    if WARMUP_ENABLED:
+        await warm_up(app, WARMUP_CONNECTIONS)
+    yield
+    access_log.flush()
+    for engine in (async_engine, *replica_set.engines):
+        await engine.dispose()
+    await logger.complete()
 
 
-@app.middleware("http")
-async def log_middleware(request: Request, call_next):
-    log_id = str(uuid4())
-    with logger.contextualize(log_id=log_id):
-        try:
-            response = await call_next(request)
-            if response.status_code in [401, 402, 403, 404]:
-                logger.warning(f"Request to {request.url.path} failed")
-            else:
-                logger.info('Successfully accessed ' + request.url.path)
-        except Exception as ex:
-            logger.error(f"Request to {request.url.path} failed: {ex}")
-            response = JSONResponse(
-                content={"success": False},
-                status_code=500,
-            )
-        return response
-
-
-app.include_router(categories.router)
-app.include_router(products.router)
-app.include_router(users.router)
-app.include_router(reviews.router)
-
-
-@app.get("/")
 async def root() -> dict:
     """Корневой маршрут, подтверждающий, что API работает."""
     return {"message": "Добро пожаловать в API интернет-магазина!"}
+
+
+def create_app() -> FastAPI:
+    """Собирает приложение: логирование, middleware, метрики и роутеры."""
+    configure_logging()
+    app = FastAPI(
+        title="FastAPI Интернет-магазин",
+        version="1.0",
+        lifespan=lifespan,
+    )
+    # Внутри журнала и метрик: повторы по Idempotency-Key тоже в них попадают
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths=("/products/", "/reviews/", "/users/"),
+    )
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    for engine in (async_engine, *replica_set.engines):
+        instrument_engine(engine)
+
+    app.include_router(categories.router)
+    app.include_router(products.router)
+    app.include_router(users.router)
+    app.include_router(reviews.router)
+    app.include_router(internal.router)
+    app.get("/")(root)
+    return app
+
+
+app = create_app()
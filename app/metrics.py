@@ -0,0 +1,259 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REGISTRY: list[Any] = []
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Монотонно растущий счётчик с метками."""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        """Регистрирует метрику в общем реестре."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        """Увеличивает значение для набора меток."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        """Строки с текущими значениями в текстовом формате Prometheus."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        """Уменьшает значение для набора меток."""
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        """Регистрирует метрику в общем реестре."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Для каждого набора меток: счётчики корзин (+Inf последним) и сумма
+        self._values: dict[tuple, list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, labels: tuple, value: float) -> None:
+        """Добавляет наблюдение в корзину и к сумме."""
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> list[str]:
+        """Строки с накопленными корзинами, суммой и числом наблюдений."""
+        lines = []
+        names = (*self.labelnames, "le")
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(names, (*labels, bound))} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "Число HTTP-запросов по маршруту и статусу.",
+    ("method", "route", "status"),
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "Число HTTP-запросов, обрабатываемых прямо сейчас.",
+    ("method",),
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса в секундах.",
+    ("method", "route"),
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "Число SQL-запросов на один HTTP-запрос.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_time_per_request_seconds = Histogram(
+    "db_time_per_request_seconds",
+    "Суммарное время SQL-запросов на один HTTP-запрос в секундах.",
+    ("method", "route"),
+)
+
+
+def render_metrics() -> str:
+    """Выгружает все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# [число запросов, суммарное время] к базе в рамках текущего HTTP-запроса
+_request_db_stats: ContextVar[list | None] = ContextVar(
+    "request_db_stats",
+    default=None,
+)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any,
+    context: Any, executemany: bool,
+) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any,
+    context: Any, executemany: bool,
+) -> None:
+    _count_query(conn.info["query_start_time"].pop())
+
+
+def _handle_error(context: Any) -> None:
+    # Упавший запрос не доходит до after_cursor_execute: снимаем его
+    # метку здесь, иначе стек на соединении растёт с каждой ошибкой
+    conn = context.connection
+    if conn is None or context.execution_context is None:
+        return
+    started = conn.info.get("query_start_time")
+    if started:
+        _count_query(started.pop())
+
+
+def _count_query(started: float) -> None:
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подписывает счётчики запросов на события движка SQLAlchemy.
+
+    Повторный вызов для того же движка ничего не делает.
+    """
+    if event.contains(
+        engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        return
+    event.listen(
+        engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+    )
+    event.listen(
+        engine.sync_engine, "after_cursor_execute", _after_cursor_execute
+    )
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware, собирающее метрики по шаблону маршрута.
+
+    Написано без BaseHTTPMiddleware, чтобы не создавать лишних задач и
+    держать накладные расходы в пределах микросекунд на запрос.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Оборачивает ASGI-приложение."""
+        self.app = app
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Обрабатывает запрос и записывает его метрики."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        db_stats = [0, 0.0]
+        token = _request_db_stats.set(db_stats)
+        http_requests_in_progress.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_progress.dec((method,))
+            _request_db_stats.reset(token)
+            # Маршрутизатор кладёт найденный маршрут в тот же scope
+            route = scope.get("route")
+            labels = (method, route.path if route else "unmatched")
+            http_requests_total.inc((*labels, status_code))
+            http_request_duration_seconds.observe(labels, duration)
+            db_queries_per_request.observe(labels, db_stats[0])
+            db_time_per_request_seconds.observe(labels, db_stats[1])
@@ -0,0 +1,30 @@
+"""Add product catalog indexes
+
+Revision ID: a1c4e7d2b9f0
+Revises: 858cbb7d5a4f
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c4e7d2b9f0'
+down_revision: Union[str, Sequence[str], None] = '858cbb7d5a4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_products_category_id'), 'products', ['category_id'], unique=False)
+    op.create_index(op.f('ix_products_seller_id'), 'products', ['seller_id'], unique=False)
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_price_id', table_name='products')
+    op.drop_index(op.f('ix_products_seller_id'), table_name='products')
+    op.drop_index(op.f('ix_products_category_id'), table_name='products')
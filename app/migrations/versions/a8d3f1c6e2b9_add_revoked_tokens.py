@@ -0,0 +1,58 @@
+"""Add revoked tokens
+
+Revision ID: a8d3f1c6e2b9
+Revises: f2c6a8e0d4b7
+Create Date: 2026-10-17 16:41:07.318264
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3f1c6e2b9'
+down_revision: Union[str, Sequence[str], None] = 'f2c6a8e0d4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('jti', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column(
+            'revoked_at',
+            sa.DateTime(),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('jti'),
+    )
+    op.create_index(
+        op.f('ix_revoked_tokens_user_id'),
+        'revoked_tokens',
+        ['user_id'],
+    )
+    op.create_index(
+        op.f('ix_revoked_tokens_expires_at'),
+        'revoked_tokens',
+        ['expires_at'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f('ix_revoked_tokens_expires_at'),
+        table_name='revoked_tokens',
+    )
+    op.drop_index(
+        op.f('ix_revoked_tokens_user_id'),
+        table_name='revoked_tokens',
+    )
+    op.drop_table('revoked_tokens')
@@ -0,0 +1,52 @@
+"""Add product review counters
+
+Revision ID: b7e2f5a0c3d1
+Revises: a1c4e7d2b9f0
+Create Date: 2026-10-17 11:04:27.902114
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f5a0c3d1'
+down_revision: Union[str, Sequence[str], None] = 'a1c4e7d2b9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('products', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    # Заполняем счётчики по уже существующим активным отзывам
+    op.execute(
+        """
+        UPDATE products SET
+            review_count = (
+                SELECT count(*) FROM reviews
+                WHERE reviews.product_id = products.id AND reviews.is_active
+            ),
+            rating_sum = (
+                SELECT coalesce(sum(reviews.grade), 0) FROM reviews
+                WHERE reviews.product_id = products.id AND reviews.is_active
+            )
+        """
+    )
+    op.execute(
+        """
+        UPDATE products SET rating = CASE
+            WHEN review_count > 0
+            THEN CAST(rating_sum AS FLOAT) / review_count
+            ELSE 0
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'rating_sum')
+    op.drop_column('products', 'review_count')
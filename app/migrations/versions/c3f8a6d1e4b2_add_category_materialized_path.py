@@ -0,0 +1,54 @@
+"""Add category materialized path
+
+Revision ID: c3f8a6d1e4b2
+Revises: b7e2f5a0c3d1
+Create Date: 2026-10-17 12:21:09.117530
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a6d1e4b2'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f5a0c3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('categories', sa.Column('path', sa.String(length=255), nullable=True))
+    # Строим пути обходом дерева от корней
+    categories = sa.table(
+        'categories',
+        sa.column('id', sa.Integer()),
+        sa.column('parent_id', sa.Integer()),
+        sa.column('path', sa.String()),
+    )
+    bind = op.get_bind()
+    children = {}
+    for category_id, parent_id in bind.execute(
+        sa.select(categories.c.id, categories.c.parent_id)
+    ):
+        children.setdefault(parent_id, []).append(category_id)
+    stack = [(category_id, '') for category_id in children.get(None, [])]
+    while stack:
+        category_id, parent_path = stack.pop()
+        path = f'{parent_path}{category_id}/'
+        bind.execute(
+            categories.update()
+            .where(categories.c.id == category_id)
+            .values(path=path)
+        )
+        stack.extend((child, path) for child in children.get(category_id, []))
+    with op.batch_alter_table('categories') as batch_op:
+        batch_op.alter_column('path', existing_type=sa.String(length=255), nullable=False)
+    op.create_index('ix_categories_path', 'categories', ['path'], unique=False, postgresql_ops={'path': 'varchar_pattern_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_categories_path', table_name='categories')
+    op.drop_column('categories', 'path')
@@ -0,0 +1,31 @@
+"""Add product sku
+
+Revision ID: d9a2c4e6f1b3
+Revises: c3f8a6d1e4b2
+Create Date: 2026-10-17 13:40:52.664019
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a2c4e6f1b3'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a6d1e4b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.create_unique_constraint('uq_products_seller_sku', ['seller_id', 'sku'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('uq_products_seller_sku', type_='unique')
+    op.drop_column('products', 'sku')
@@ -0,0 +1,66 @@
+"""Add product review stats
+
+Revision ID: f2c6a8e0d4b7
+Revises: e5b1d7a9c2f4
+Create Date: 2026-10-17 15:08:41.552930
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8e0d4b7'
+down_revision: Union[str, Sequence[str], None] = 'e5b1d7a9c2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_review_stats',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('grade_1', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('grade_2', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('grade_3', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('grade_4', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('grade_5', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_review_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('product_id'),
+    )
+    op.create_index(
+        'ix_reviews_product_active_date',
+        'reviews',
+        ['product_id', 'is_active', 'comment_date'],
+    )
+    # Заполняем сводку по уже существующим активным отзывам
+    op.execute(
+        """
+        INSERT INTO product_review_stats (
+            product_id, grade_1, grade_2, grade_3, grade_4, grade_5,
+            total, last_review_at
+        )
+        SELECT
+            product_id,
+            sum(CASE WHEN grade = 1 THEN 1 ELSE 0 END),
+            sum(CASE WHEN grade = 2 THEN 1 ELSE 0 END),
+            sum(CASE WHEN grade = 3 THEN 1 ELSE 0 END),
+            sum(CASE WHEN grade = 4 THEN 1 ELSE 0 END),
+            sum(CASE WHEN grade = 5 THEN 1 ELSE 0 END),
+            count(*),
+            max(comment_date)
+        FROM reviews
+        WHERE is_active
+        GROUP BY product_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_product_active_date', table_name='reviews')
+    op.drop_table('product_review_stats')
@@ -1,6 +1,9 @@
 from .categories import Category
 from .products import Product
+from .review_stats import ProductReviewStats
 from .reviews import Review
+from .revoked_tokens import RevokedToken
 from .users import User
 
-__all__ = ["Category", "Product", "User", "Review"]
+__all__ = ["Category", "Product", "User", "Review", "ProductReviewStats",
+           "RevokedToken"]
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from sqlalchemy import Boolean, ForeignKey, String
+from sqlalchemy import Boolean, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -16,6 +16,8 @@ class Category(Base):
         nullable=True
     )
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Материализованный путь из ID предков, например "1/4/9/"
+    path: Mapped[str] = mapped_column(String(255), nullable=False)
     products: Mapped[list["Product"]] = relationship(
         "Product",
         back_populates="category"
@@ -27,3 +29,12 @@ class Category(Base):
     )
     children: Mapped[list["Category"]] = relationship("Category",
                                                       back_populates="parent")
+
+    __table_args__ = (
+        # varchar_pattern_ops позволяет Postgres искать по префиксу LIKE
+        Index(
+            "ix_categories_path",
+            "path",
+            postgresql_ops={"path": "varchar_pattern_ops"},
+        ),
+    )
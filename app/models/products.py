@@ -1,6 +1,17 @@
 from decimal import Decimal
 
-from sqlalchemy import Boolean, Float, ForeignKey, Integer, Numeric, String
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+    event,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -17,17 +28,85 @@ class Product(Base):
     stock: Mapped[int] = mapped_column(Integer, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     rating: Mapped[Decimal] = mapped_column(Numeric(3, 2), default=0.00)
+    review_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+    )
+    rating_sum: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+    )
     category_id: Mapped[int] = mapped_column(
         ForeignKey("categories.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
     seller_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
+    # Артикул продавца, по нему выполняется массовый импорт
+    sku: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     category: Mapped["Category"] = relationship(
         "Category",
         back_populates="products"
     )
     seller: Mapped["User"] = relationship("User", back_populates="products")
+
+    __table_args__ = (
+        Index("ix_products_price_id", "price", "id"),
+        UniqueConstraint("seller_id", "sku", name="uq_products_seller_sku"),
+    )
+
+
+# Полнотекстовый индекс не описан в модели: в Postgres это генерируемая
+# колонка tsvector с GIN-индексом, в SQLite - внешняя таблица FTS5,
+# которую поддерживают триггеры. Тексты совпадают с миграцией e5b1d7a9c2f4.
+POSTGRES_SEARCH_DDL = (
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, "
+    "coalesce(name, '') || ' ' || coalesce(description, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector "
+    "ON products USING gin (search_vector)",
+)
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products "
+    "BEGIN INSERT INTO products_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products "
+    "BEGIN INSERT INTO products_fts(products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    # Только при смене текста, чтобы изменения остатков не трогали индекс
+    "CREATE TRIGGER IF NOT EXISTS products_fts_au "
+    "AFTER UPDATE OF name, description ON products "
+    "BEGIN INSERT INTO products_fts(products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO products_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+)
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(
+        Product.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Product.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+event.listen(
+    Product.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+def _counter() -> Mapped[int]:
+    return mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+    )
+
+
+class ProductReviewStats(Base):
+    # Сводка по активным отзывам товара, меняется вместе с отзывами
+    __tablename__ = 'product_review_stats'
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey('products.id'),
+        primary_key=True,
+    )
+    grade_1: Mapped[int] = _counter()
+    grade_2: Mapped[int] = _counter()
+    grade_3: Mapped[int] = _counter()
+    grade_4: Mapped[int] = _counter()
+    grade_5: Mapped[int] = _counter()
+    total: Mapped[int] = _counter()
+    last_review_at: Mapped[datetime | None] = mapped_column(
+        DateTime,
+        nullable=True,
+    )
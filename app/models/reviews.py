@@ -5,6 +5,7 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Text,
 )
@@ -41,4 +42,10 @@ class Review(Base):
 
     __table_args__ = (
         CheckConstraint('grade >= 1 AND grade <= 5', name='check_grade_range'),
+        Index(
+            'ix_reviews_product_active_date',
+            'product_id',
+            'is_active',
+            'comment_date',
+        ),
     )
@@ -0,0 +1,102 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Кодирует значения ключа сортировки в непрозрачный курсор."""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    columns: Sequence[ColumnElement],
+) -> list[Any]:
+    """Декодирует курсор и приводит значения к типам колонок сортировки."""
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor",
+    )
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise invalid_cursor
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise invalid_cursor
+    try:
+        return [
+            _coerce(value, column) for value, column in zip(values, columns)
+        ]
+    except (TypeError, ValueError):
+        raise invalid_cursor
+
+
+def _coerce(value: Any, column: ColumnElement) -> Any:
+    """Приводит значение из курсора к типу колонки сортировки.
+
+    Значение, которое нельзя привести, - ошибка: иначе оно попало бы в
+    запрос как есть, и Postgres отверг бы его на этапе выполнения.
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError(value)
+    if python_type is int and not isinstance(value, int):
+        raise TypeError(value)
+    if python_type is str and not isinstance(value, str):
+        raise TypeError(value)
+    if python_type in (float, Decimal) and isinstance(value, str):
+        raise TypeError(value)
+    return python_type(value)
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    stmt: Select,
+    order_by: Sequence[ColumnElement],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> tuple[list[Any], str | None]:
+    """Возвращает страницу по ключу сортировки и курсор следующей страницы.
+
+    Вместо OFFSET используется условие (k1, k2, ...) > (:v1, :v2, ...),
+    поэтому любая страница стоит столько же, сколько первая. Для выборки
+    одной сущности элементы страницы - её объекты, для выборки колонок -
+    словари по именам колонок.
+    """
+    names = [column["name"] for column in stmt.column_descriptions]
+    key = tuple_(*order_by)
+    if cursor is not None:
+        values = tuple_(*decode_cursor(cursor, order_by))
+        stmt = stmt.where(key < values if descending else key > values)
+    ordering = [c.desc() if descending else c.asc() for c in order_by]
+    stmt = stmt.add_columns(*order_by).order_by(*ordering).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-len(order_by):])
+    if len(names) == 1:
+        return [row[0] for row in rows], next_cursor
+    return [dict(zip(names, row)) for row in rows], next_cursor
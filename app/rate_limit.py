@@ -0,0 +1,170 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from fastapi import HTTPException, Request, status
+from loguru import logger
+
+from app.config import RATE_LIMIT_MAX_KEYS, RATE_LIMIT_URL
+from app.metrics import Counter
+from app.redis_backend import RedisBackend
+
+rate_limit_rejections_total = Counter(
+    "rate_limit_rejections_total",
+    "Запросы, отклонённые ограничением частоты, по правилу.",
+    ("scope",),
+)
+
+# Token bucket в виде GCRA: вместо числа жетонов хранится время, когда
+# ведро снова станет полным (TAT). Ведро с TAT в прошлом полное, и его
+# можно не хранить вовсе - на этом построено вытеснение ключей
+_GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local allow_at = tat + interval - burst * interval
+if now < allow_at then
+    return tostring(allow_at - now)
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+return '0'
+"""
+
+
+class RateLimitBackend(Protocol):
+    """Хранилище вёдер ограничения частоты."""
+
+    async def acquire(self, key: str, interval: float, burst: int) -> float:
+        """Берёт жетон из ведра key.
+
+        Жетон восполняется раз в interval секунд, в ведре их не больше
+        burst. Возвращает 0, если жетон выдан, иначе - через сколько
+        секунд он появится.
+        """
+
+
+class MemoryRateLimitBackend:
+    """Вёдра в памяти процесса: одно число на ключ.
+
+    Раз в sweep_seconds удаляются полные вёдра. Если ключей больше
+    max_keys, забываются давно не использованные: такой ключ получает
+    полное ведро, поэтому переполнение ослабляет ограничение, но не
+    блокирует лишнего.
+    """
+
+    def __init__(self, max_keys: int, sweep_seconds: float = 60) -> None:
+        """Создаёт пустое хранилище на max_keys ключей."""
+        self.max_keys = max_keys
+        self.sweep_seconds = sweep_seconds
+        self._tats: OrderedDict[str, float] = OrderedDict()
+        self._next_sweep = time.monotonic() + sweep_seconds
+
+    async def acquire(self, key: str, interval: float, burst: int) -> float:
+        """Берёт жетон из ведра key, см. RateLimitBackend.acquire."""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        tat = max(self._tats.get(key, now), now)
+        allow_at = tat + interval - burst * interval
+        if now < allow_at:
+            return allow_at - now
+        self._tats[key] = tat + interval
+        self._tats.move_to_end(key)
+        while len(self._tats) > self.max_keys:
+            self._tats.popitem(last=False)
+        return 0.0
+
+    def _sweep(self, now: float) -> None:
+        self._tats = OrderedDict(
+            (key, tat) for key, tat in self._tats.items() if tat > now
+        )
+        self._next_sweep = now + self.sweep_seconds
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class RedisRateLimitBackend(RedisBackend):
+    """Вёдра в Redis или любом сервере с тем же протоколом и Lua.
+
+    Общие для всех процессов приложения. Ведро обновляется атомарно
+    Lua-скриптом по часам сервера и удаляется сервером, когда снова
+    становится полным. При ошибке соединения запрос пропускается.
+    """
+
+    default_prefix = "rate_limit"
+
+    def __init__(self, client: Any, prefix: str | None = None) -> None:
+        """Принимает клиент redis.asyncio (или совместимый с ним)."""
+        super().__init__(client, prefix)
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    async def acquire(self, key: str, interval: float, burst: int) -> float:
+        """Берёт жетон из ведра key, см. RateLimitBackend.acquire."""
+        try:
+            wait = await self._script(
+                keys=[self._key(key)],
+                args=[repr(interval), burst],
+            )
+        except self._errors as exc:
+            logger.warning("Rate limit backend error: {!r}", exc)
+            return 0.0
+        return float(wait)
+
+
+rate_limit_backend: RateLimitBackend = (
+    RedisRateLimitBackend.from_url(RATE_LIMIT_URL) if RATE_LIMIT_URL
+    else MemoryRateLimitBackend(RATE_LIMIT_MAX_KEYS)
+)
+
+
+def client_ip(request: Request) -> str:
+    """IP клиента; за прокси берётся из заголовков сервером (uvicorn
+    --proxy-headers).
+    """
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """Правило ограничения частоты: burst запросов сразу, дальше
+    per_minute в минуту.
+
+    Экземпляр - FastAPI-зависимость, ограничивающая маршрут по IP
+    клиента. Для других ключей обработчик или зависимость вызывает
+    check() сам.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        per_minute: float,
+        burst: int,
+        backend: RateLimitBackend | None = None,
+    ) -> None:
+        """Создаёт правило с именем scope (префикс ключей и метка метрики)."""
+        self.scope = scope
+        self.interval = 60 / per_minute
+        self.burst = burst
+        self.backend = backend
+
+    async def check(self, key: str) -> None:
+        """Берёт жетон для key или отвечает 429 с Retry-After."""
+        backend = self.backend or rate_limit_backend
+        wait = await backend.acquire(
+            f"{self.scope}:{key}", self.interval, self.burst
+        )
+        if wait > 0:
+            rate_limit_rejections_total.inc((self.scope,))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    async def __call__(self, request: Request) -> None:
+        """Зависимость маршрута: ограничение по IP клиента."""
+        await self.check(client_ip(request))
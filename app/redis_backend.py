@@ -0,0 +1,31 @@
+from typing import Any, Self
+
+
+class RedisBackend:
+    """Основа хранилищ в Redis или любом сервере с тем же протоколом.
+
+    Держит клиент, префикс ключей и ошибки соединения, которые
+    наследники перехватывают, чтобы недоступность Redis не роняла
+    запрос. Пакет redis импортируется лениво: без *_URL он не нужен.
+    """
+
+    default_prefix = "redis"
+
+    def __init__(self, client: Any, prefix: str | None = None) -> None:
+        """Принимает клиент redis.asyncio (или совместимый с ним)."""
+        from redis.exceptions import RedisError
+
+        self.client = client
+        self.prefix = self.default_prefix if prefix is None else prefix
+        self._errors = (RedisError, OSError)
+
+    @classmethod
+    def from_url(cls, url: str) -> Self:
+        """Создаёт клиент по URL вида redis://host:port/db."""
+        import redis.asyncio
+
+        return cls(redis.asyncio.from_url(url))
+
+    def _key(self, *parts: str) -> str:
+        """Ключ под префиксом хранилища: prefix:part:..."""
+        return ":".join((self.prefix, *parts))
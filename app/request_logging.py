@@ -0,0 +1,239 @@
+import asyncio
+import atexit
+import json
+import os
+import random
+import sys
+import time
+from contextvars import ContextVar
+
+from fastapi.responses import JSONResponse
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import (
+    LOG_BATCH_SIZE,
+    LOG_BUFFER_SIZE,
+    LOG_FILE,
+    LOG_FLUSH_SECONDS,
+    LOG_LEVEL,
+    LOG_RETENTION,
+    LOG_ROTATION,
+    LOG_SAMPLE_RATE,
+    LOG_SLOW_REQUEST_SECONDS,
+)
+
+# Поля записи о текущем запросе, которые заполняют обработчики
+_request_log_fields: ContextVar[dict | None] = ContextVar(
+    "request_log_fields",
+    default=None,
+)
+
+
+def set_log_user(user_id: int) -> None:
+    """Запоминает пользователя текущего запроса для записи в лог."""
+    fields = _request_log_fields.get()
+    if fields is not None:
+        fields["user_id"] = user_id
+
+
+def _log_id(fields: dict) -> str:
+    """ID запроса; создаётся лениво, только если запрос попадёт в лог."""
+    log_id = fields.get("log_id")
+    if log_id is None:
+        log_id = fields["log_id"] = os.urandom(16).hex()
+    return log_id
+
+
+def _add_log_id(record: dict) -> None:
+    """Добавляет log_id текущего запроса ко всем записям loguru."""
+    fields = _request_log_fields.get()
+    if fields is not None:
+        record["extra"]["log_id"] = _log_id(fields)
+
+
+def _json_line(record: dict) -> str:
+    """Формат файлового лога: одна JSON-строка на запись.
+
+    Пачка записей о запросах уже собрана в JSON-строки и выводится как
+    есть.
+    """
+    extra = record["extra"]
+    if "access" in extra:
+        return "{extra[access]}"
+    line = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "log_id": extra.get("log_id"),
+        "message": record["message"],
+    }
+    if record["exception"] is not None:
+        line["exception"] = repr(record["exception"].value)
+    extra["json"] = json.dumps(line, ensure_ascii=False, default=str)
+    return "{extra[json]}\n"
+
+
+class AccessLogBuffer:
+    """Копит записи о запросах и передаёт их в loguru пачками.
+
+    Передача в фоновый sink (enqueue) стоит дорого, поэтому одна запись
+    loguru несёт до batch_size запросов. Пачка уходит при заполнении,
+    через flush_seconds после первой записи или сразу при ошибке.
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float) -> None:
+        """Создаёт пустой буфер."""
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._lines: list[str] = []
+        self._level = "INFO"
+
+    def add(self, entry: dict, level: str) -> None:
+        """Добавляет запись о запросе в текущую пачку."""
+        self._lines.append(json.dumps(entry, ensure_ascii=False))
+        if level != "INFO" and self._level != "ERROR":
+            self._level = level
+        if level == "ERROR" or len(self._lines) >= self.batch_size:
+            self.flush()
+        elif len(self._lines) == 1:
+            try:
+                asyncio.get_running_loop().call_later(
+                    self.flush_seconds, self.flush
+                )
+            except RuntimeError:
+                self.flush()
+
+    def flush(self) -> None:
+        """Отдаёт накопленную пачку в loguru."""
+        if not self._lines:
+            return
+        text = "\n".join(self._lines) + "\n"
+        level, self._lines, self._level = self._level, [], "INFO"
+        logger.bind(access=text).log(level, "requests")
+
+
+access_log = AccessLogBuffer(LOG_BATCH_SIZE, LOG_FLUSH_SECONDS)
+
+
+def configure_logging() -> None:
+    """Настраивает вывод в stderr и JSON-лог в файл.
+
+    Файловый sink пишет из фонового потока (enqueue) через буфер
+    LOG_BUFFER_SIZE байт, с ротацией и удалением старых файлов.
+    Записи о запросах в stderr не дублируются.
+    """
+    logger.remove()
+    logger.configure(patcher=_add_log_id)
+    logger.add(
+        sys.stderr,
+        level=LOG_LEVEL,
+        filter=lambda record: "access" not in record["extra"],
+    )
+    logger.add(
+        LOG_FILE,
+        format=_json_line,
+        level=LOG_LEVEL,
+        enqueue=True,
+        rotation=LOG_ROTATION,
+        retention=LOG_RETENTION,
+        buffering=LOG_BUFFER_SIZE,
+    )
+    atexit.register(access_log.flush)
+
+
+class RequestLoggingMiddleware:
+    """ASGI-middleware журнала запросов.
+
+    Ошибки и медленные запросы записываются всегда, успешные - с
+    вероятностью LOG_SAMPLE_RATE. Необработанное исключение превращается
+    в ответ 500 {"success": false}.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = LOG_SAMPLE_RATE,
+        slow_request_seconds: float = LOG_SLOW_REQUEST_SECONDS,
+    ) -> None:
+        """Оборачивает ASGI-приложение."""
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_seconds = slow_request_seconds
+        self.min_level_no = logger.level(LOG_LEVEL).no
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Обрабатывает запрос и при необходимости пишет его в лог."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        response_started = False
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+            await send(message)
+
+        fields: dict = {}
+        token = _request_log_fields.set(fields)
+        started = time.perf_counter()
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as exc:
+            if response_started:
+                raise
+            error = exc
+            await JSONResponse(
+                content={"success": False},
+                status_code=500,
+            )(scope, receive, send)
+        finally:
+            _request_log_fields.reset(token)
+        duration = time.perf_counter() - started
+        self._log(scope, status_code, duration, fields, error)
+
+    def _log(
+        self,
+        scope: Scope,
+        status_code: int,
+        duration: float,
+        fields: dict,
+        error: Exception | None,
+    ) -> None:
+        """Решает, попадёт ли запрос в журнал, и добавляет запись."""
+        if (
+            status_code < 400
+            and duration < self.slow_request_seconds
+            and random.random() >= self.sample_rate
+        ):
+            return
+        if error is not None:
+            level = "ERROR"
+        elif status_code >= 400 or duration >= self.slow_request_seconds:
+            level = "WARNING"
+        else:
+            level = "INFO"
+        if logger.level(level).no < self.min_level_no:
+            return
+        route = scope.get("route")
+        entry = {
+            "time": time.time(),
+            "level": level,
+            "log_id": _log_id(fields),
+            "method": scope["method"],
+            "route": route.path if route else scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "user_id": fields.get("user_id"),
+        }
+        if error is not None:
+            entry["error"] = repr(error)
+        access_log.add(entry, level)
@@ -0,0 +1,198 @@
+import itertools
+from typing import Awaitable, Callable, Protocol
+
+from fastapi import Request
+from loguru import logger
+
+from app.cache import LRUTTLCache
+from app.config import (
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_URL,
+)
+from app.metrics import Counter
+from app.redis_backend import RedisBackend
+from app.serialization import JSONBytesResponse
+
+CATEGORIES_TAG = "categories"
+
+response_cache_requests_total = Counter(
+    "response_cache_requests_total",
+    "Обращения к кэшу ответов по маршруту и результату (hit/miss).",
+    ("route", "result"),
+)
+
+
+class CacheBackend(Protocol):
+    """Хранилище кэша ответов: байты по строковому ключу и версии тегов."""
+
+    async def get(self, key: str) -> bytes | None:
+        """Возвращает сохранённое значение или None."""
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд."""
+
+    async def tag_versions(self, tags: tuple[str, ...]) -> list[int] | None:
+        """Возвращает текущие версии тегов, None - хранилище недоступно."""
+
+    async def bump(self, tags: tuple[str, ...]) -> None:
+        """Меняет версии тегов, делая недоступными все записи с ними."""
+
+
+class MemoryCacheBackend:
+    """Кэш в памяти процесса: LRU с временем жизни записей."""
+
+    def __init__(self, maxsize: int) -> None:
+        """Создаёт хранилище на maxsize записей и столько же тегов."""
+        self._entries = LRUTTLCache(maxsize, ttl=0)
+        self._versions = LRUTTLCache(maxsize, ttl=float("inf"))
+        # Версии выдаются из общего счётчика: тег, вытесненный из LRU,
+        # получит новую версию и не совпадёт со старыми записями
+        self._generation = itertools.count(1)
+
+    async def get(self, key: str) -> bytes | None:
+        """Возвращает сохранённое значение или None."""
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд."""
+        self._entries.set(key, value, ttl=ttl)
+
+    async def tag_versions(self, tags: tuple[str, ...]) -> list[int]:
+        """Возвращает текущие версии тегов."""
+        versions = []
+        for tag in tags:
+            version = self._versions.get(tag)
+            if version is None:
+                version = next(self._generation)
+                self._versions.set(tag, version)
+            versions.append(version)
+        return versions
+
+    async def bump(self, tags: tuple[str, ...]) -> None:
+        """Меняет версии тегов, делая недоступными все записи с ними."""
+        for tag in tags:
+            self._versions.set(tag, next(self._generation))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(RedisBackend):
+    """Кэш в Redis или любом сервере с тем же протоколом.
+
+    Общий для всех процессов приложения, поэтому инвалидация в одном
+    процессе сразу видна остальным. Ошибки соединения не роняют запрос:
+    чтение считается промахом, запись пропускается.
+    """
+
+    default_prefix = "response_cache"
+
+    async def get(self, key: str) -> bytes | None:
+        """Возвращает сохранённое значение или None."""
+        try:
+            return await self.client.get(self._key(key))
+        except self._errors as exc:
+            logger.warning("Response cache read failed: {}", exc)
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд."""
+        try:
+            await self.client.set(
+                self._key(key), value, px=int(ttl * 1000)
+            )
+        except self._errors as exc:
+            logger.warning("Response cache write failed: {}", exc)
+
+    async def tag_versions(self, tags: tuple[str, ...]) -> list[int] | None:
+        """Возвращает текущие версии тегов, None - хранилище недоступно."""
+        # MGET без ключей Redis отвергает как ошибку синтаксиса
+        if not tags:
+            return []
+        try:
+            values = await self.client.mget(
+                [self._key("tag", tag) for tag in tags]
+            )
+        except self._errors as exc:
+            logger.warning("Response cache read failed: {}", exc)
+            return None
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags: tuple[str, ...]) -> None:
+        """Меняет версии тегов, делая недоступными все записи с ними."""
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(self._key("tag", tag))
+                await pipe.execute()
+        except self._errors as exc:
+            logger.warning("Response cache invalidation failed: {}", exc)
+
+
+class ResponseCache:
+    """Кэш готовых JSON-ответов с инвалидацией по тегам.
+
+    Ключ записи включает путь, параметры запроса и версии её тегов.
+    Обработчики записи вызывают invalidate() с теми же тегами, после чего
+    старые записи перестают находиться и вытесняются по TTL или LRU.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        """Создаёт кэш поверх хранилища со временем жизни ttl секунд."""
+        self.backend = backend
+        self.ttl = ttl
+
+    async def respond(
+        self,
+        request: Request,
+        tags: tuple[str, ...],
+        load: Callable[[], Awaitable[bytes]],
+        ttl: float | None = None,
+    ) -> JSONBytesResponse:
+        """Отдаёт ответ из кэша или строит его через load() и сохраняет.
+
+        Если у записи есть теги, load() должен читать с основной базы:
+        отстающая реплика после invalidate() вернула бы старые данные, и
+        они легли бы в кэш под новой версией тега на весь TTL. ttl
+        переопределяет время жизни записи для данных без точной
+        инвалидации.
+        """
+        route = request.scope["route"].path
+        versions = await self.backend.tag_versions(tags)
+        if versions is None:
+            # Без версий тегов нельзя отличить свежую запись от старой
+            return JSONBytesResponse(await load())
+        query = "&".join(
+            f"{name}={value}"
+            for name, value in sorted(request.query_params.multi_items())
+        )
+        key = "{}?{}|{}".format(
+            request.url.path,
+            query,
+            ",".join(map(str, versions)),
+        )
+        body = await self.backend.get(key)
+        if body is not None:
+            response_cache_requests_total.inc((route, "hit"))
+            return JSONBytesResponse(body)
+        response_cache_requests_total.inc((route, "miss"))
+        body = await load()
+        await self.backend.set(key, body, self.ttl if ttl is None else ttl)
+        return JSONBytesResponse(body)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Делает недоступными все записи, помеченные любым из тегов."""
+        await self.backend.bump(tags)
+
+
+def product_reviews_tag(product_id: int) -> str:
+    """Тег кэша отзывов товара."""
+    return f"product:{product_id}:reviews"
+
+
+response_cache = ResponseCache(
+    RedisCacheBackend.from_url(RESPONSE_CACHE_URL) if RESPONSE_CACHE_URL
+    else MemoryCacheBackend(RESPONSE_CACHE_SIZE),
+    ttl=RESPONSE_CACHE_TTL,
+)
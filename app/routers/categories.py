@@ -1,11 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from typing import Literal
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    ScalarSelect,
+    case,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
-from app.db_depends import get_async_db
+from app.db_depends import get_async_db, get_async_read_db
+from app.expand import expand_options, expand_param
 from app.models.categories import Category as CategoryModel
+from app.models.products import Product as ProductModel
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_paginate
+from app.response_cache import CATEGORIES_TAG, response_cache
+from app.routers.products import PRODUCT_RELATIONS, SORT_KEYS, product_expand
 from app.schemas import Category as CategorySchema
-from app.schemas import CategoryCreate
+from app.schemas import CategoryCreate, CategoryExpanded, ProductPage
+from app.serialization import (
+    JSONBytesResponse,
+    dump_json,
+    row_dicts,
+    schema_columns,
+)
 
 router = APIRouter(
     prefix="/categories",
@@ -13,16 +44,147 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=list[CategorySchema])
+category_list_adapter = TypeAdapter(list[CategoryExpanded])
+
+CATEGORY_RELATIONS = {
+    "parent": CategoryModel.parent,
+    "children": CategoryModel.children.and_(CategoryModel.is_active),
+}
+category_expand = expand_param(CATEGORY_RELATIONS)
+
+
+@router.get("/", response_model=list[CategoryExpanded])
 async def get_all_categories(
+    request: Request,
+    expand: frozenset[str] = Depends(category_expand),
     db: AsyncSession = Depends(get_async_db)
-) -> list[CategorySchema]:
-    """Возвращает список всех активных категорий."""
-    stmt = select(CategoryModel).where(CategoryModel.is_active)
-    categories = await db.scalars(stmt)
+) -> JSONBytesResponse:
+    """Возвращает список всех активных категорий.
+
+    Промах кэша читается с основной базы, см. ResponseCache.respond().
+    """
+    async def load() -> bytes:
+        if expand:
+            categories = await db.scalars(
+                select(CategoryModel)
+                .options(*expand_options(CATEGORY_RELATIONS, expand))
+                .where(CategoryModel.is_active)
+            )
+            return dump_json(category_list_adapter, categories.all())
+        stmt = select(
+            *schema_columns(CategorySchema, CategoryModel)
+        ).where(CategoryModel.is_active)
+        categories = await db.execute(stmt)
+        return dump_json(category_list_adapter, row_dicts(categories))
+
+    return await response_cache.respond(request, (CATEGORIES_TAG,), load)
+
+
+async def _category_path(db: AsyncSession, category_id: int) -> str:
+    """Возвращает материализованный путь активной категории или 404."""
+    path = await db.scalar(
+        select(CategoryModel.path)
+        .where(CategoryModel.id == category_id, CategoryModel.is_active)
+    )
+    if path is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return path
+
+
+def _in_subtree(path: str) -> ColumnElement[bool]:
+    """Условие для WHERE: категория лежит в поддереве с путём path.
+
+    Шаблон LIKE передаётся готовым значением, а не выражением от
+    подзапроса: только так Postgres сканирует по префиксу индекс
+    varchar_pattern_ops.
+    """
+    return CategoryModel.path.like(f"{path}%")
+
+
+def _active_path(category_id: int) -> ScalarSelect:
+    """Подзапрос с путём активной категории, NULL для удалённой."""
+    return (
+        select(CategoryModel.path)
+        .where(CategoryModel.id == category_id, CategoryModel.is_active)
+        .scalar_subquery()
+    )
+
+
+@router.get(
+    "/{category_id}/subtree",
+    response_model=list[CategoryExpanded],
+)
+async def get_category_subtree(
+    category_id: int,
+    expand: frozenset[str] = Depends(category_expand),
+    db: AsyncSession = Depends(get_async_read_db)
+) -> list[CategoryExpanded]:
+    """Возвращает категорию и всех её активных потомков."""
+    path = await _category_path(db, category_id)
+    categories = await db.scalars(
+        select(CategoryModel)
+        .options(*expand_options(CATEGORY_RELATIONS, expand))
+        .where(_in_subtree(path), CategoryModel.is_active)
+        .order_by(CategoryModel.path)
+    )
     return categories.all()
 
 
+@router.get(
+    "/{category_id}/ancestors",
+    response_model=list[CategoryExpanded],
+)
+async def get_category_ancestors(
+    category_id: int,
+    expand: frozenset[str] = Depends(category_expand),
+    db: AsyncSession = Depends(get_async_read_db)
+) -> list[CategoryExpanded]:
+    """Возвращает цепочку категорий от корня до заданной (breadcrumbs).
+
+    Предки берутся по ID из пути категории. Если кто-то из них удалён,
+    цепочки нет - 404, как и для удалённой категории.
+    """
+    path = await _category_path(db, category_id)
+    ancestor_ids = [int(part) for part in path.split("/")[:-1]]
+    categories = await db.scalars(
+        select(CategoryModel)
+        .options(*expand_options(CATEGORY_RELATIONS, expand))
+        .where(CategoryModel.id.in_(ancestor_ids), CategoryModel.is_active)
+        .order_by(func.length(CategoryModel.path))
+    )
+    result = categories.all()
+    if len(result) != len(ancestor_ids):
+        raise HTTPException(status_code=404, detail="Category not found")
+    return result
+
+
+@router.get("/{category_id}/products", response_model=ProductPage)
+async def get_category_products(
+    category_id: int,
+    sort: Literal["id", "price"] = "id",
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    expand: frozenset[str] = Depends(product_expand),
+    db: AsyncSession = Depends(get_async_read_db)
+) -> ProductPage:
+    """Возвращает активные товары категории и всех её подкатегорий."""
+    path = await _category_path(db, category_id)
+    stmt = (
+        select(ProductModel)
+        .options(*expand_options(PRODUCT_RELATIONS, expand))
+        .join(CategoryModel, ProductModel.category_id == CategoryModel.id)
+        .where(
+            _in_subtree(path),
+            CategoryModel.is_active,
+            ProductModel.is_active,
+        )
+    )
+    items, next_cursor = await keyset_paginate(
+        db, stmt, SORT_KEYS[sort], cursor, limit
+    )
+    return ProductPage(items=items, next_cursor=next_cursor)
+
+
 @router.post(
         "/",
         response_model=CategorySchema,
@@ -45,9 +207,13 @@ async def create_category(
                 status_code=400,
                 detail="Parent category not found"
             )
-    db_category = CategoryModel(**category.model_dump())
+    parent_path = parent_i.path if category.parent_id is not None else ""
+    db_category = CategoryModel(**category.model_dump(), path=parent_path)
     db.add(db_category)
+    await db.flush()
+    db_category.path = f"{parent_path}{db_category.id}/"
     await db.commit()
+    await response_cache.invalidate(CATEGORIES_TAG)
     return db_category
 
 
@@ -57,32 +223,62 @@ async def update_category(
     category: CategoryCreate,
     db: AsyncSession = Depends(get_async_db)
 ) -> CategorySchema:
-    """Обновляет категорию по её ID."""
-    stmt = select(CategoryModel).where(CategoryModel.id == category_id,
-                                       CategoryModel.is_active)
-    db_category = await db.scalars(stmt)
-    db_category_i = db_category.first()
-    if db_category_i is None:
-        raise HTTPException(status_code=404, detail="Category not found")
-    if category.parent_id is not None:
-        parent_stmt = select(CategoryModel).where(
-            CategoryModel.id == category.parent_id,
-            CategoryModel.is_active
+    """Обновляет категорию по её ID.
+
+    Переименование, перенос и перестройка путей всего поддерева
+    выполняются одним UPDATE: проверки активности и циклов стоят в WHERE,
+    а причина отказа выясняется отдельным запросом только при ошибке.
+    """
+    old_path = _active_path(category_id)
+    parent_path = _active_path(category.parent_id)
+    if category.parent_id is None:
+        new_path = literal(f"{category_id}/")
+        parent_ok = true()
+    else:
+        new_path = parent_path + f"{category_id}/"
+        # NULL, если родителя нет, и ложь, если он внутри поддерева
+        parent_ok = ~parent_path.startswith(old_path)
+    is_target = CategoryModel.id == category_id
+    rows = await db.execute(
+        update(CategoryModel)
+        .where(
+            CategoryModel.path.startswith(old_path),
+            parent_ok,
+            # Потомков трогаем, только если путь действительно меняется
+            or_(is_target, new_path != old_path),
         )
-        parent = await db.scalars(parent_stmt)
-        parent_i = parent.first()
-        if parent_i is None:
+        .values(
+            name=case((is_target, category.name), else_=CategoryModel.name),
+            parent_id=case(
+                (is_target, category.parent_id),
+                else_=CategoryModel.parent_id,
+            ),
+            path=new_path + func.substr(
+                CategoryModel.path, func.length(old_path) + 1
+            ),
+        )
+        .returning(*schema_columns(CategorySchema, CategoryModel))
+        .execution_options(synchronize_session=False)
+    )
+    updated = next(
+        (row for row in rows.mappings() if row["id"] == category_id),
+        None,
+    )
+    if updated is None:
+        if await db.scalar(select(old_path)) is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        if await db.scalar(select(parent_path)) is None:
             raise HTTPException(
                 status_code=400,
                 detail="Parent category not found"
             )
-    await db.execute(
-        update(CategoryModel)
-        .where(CategoryModel.id == category_id)
-        .values(**category.model_dump())
-    )
+        raise HTTPException(
+            status_code=400,
+            detail="Category cannot be moved into its own subtree"
+        )
     await db.commit()
-    return db_category_i
+    await response_cache.invalidate(CATEGORIES_TAG)
+    return updated
 
 
 @router.delete("/{category_id}", status_code=status.HTTP_200_OK)
@@ -91,16 +287,14 @@ async def delete_category(
     db: AsyncSession = Depends(get_async_db)
 ) -> dict:
     """Логически удаляет категорию по её ID, устанавливая is_active=False."""
-    stmt = select(CategoryModel).where(
-        CategoryModel.id == category_id,
-        CategoryModel.is_active
+    deleted = await db.scalar(
+        update(CategoryModel)
+        .where(CategoryModel.id == category_id, CategoryModel.is_active)
+        .values(is_active=False)
+        .returning(CategoryModel.id)
     )
-    category = await db.scalars(stmt)
-    category_i = category.first()
-    if category_i is None:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    await db.execute(update(CategoryModel).where(
-        CategoryModel.id == category_id).values(is_active=False)
-    )
     await db.commit()
+    await response_cache.invalidate(CATEGORIES_TAG)
     return {"status": "success", "message": "Category marked as inactive"}
@@ -0,0 +1,51 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi.responses import PlainTextResponse
+
+from app.config import INTERNAL_TOKEN
+from app.database import async_engine, pool_stats, replica_set
+from app.metrics import render_metrics
+
+
+def require_internal_token(authorization: str | None = Header(None)) -> None:
+    """Пускает к служебным эндпоинтам только с токеном INTERNAL_TOKEN.
+
+    Пока токен не задан, эндпоинты отвечают 404, как несуществующие.
+    """
+    if not INTERNAL_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Not Found")
+    if authorization is None or not hmac.compare_digest(
+        authorization.encode(), f"Bearer {INTERNAL_TOKEN}".encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid internal token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(
+    tags=["internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/internal/pool")
+async def get_pool_stats() -> dict:
+    """Показывает занятость пула соединений для подбора его размера."""
+    return {
+        "primary": pool_stats(async_engine),
+        "replicas": [pool_stats(engine) for engine in replica_set.engines],
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Отдаёт метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,20 +1,253 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    ARRAY,
+    Integer,
+    any_,
+    bindparam,
+    case,
+    exists,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.auth import get_current_seller
-from app.db_depends import get_async_db
+from app.bulk_import import ProductImporter, iter_csv, iter_ndjson
+from app.config import FACETS_CACHE_TTL
+from app.db_depends import get_async_db, get_async_read_db
+from app.expand import expand_options, expand_param
+from app.facets import load_facets
 from app.models import Category as CategoryModel
 from app.models import Product as ProductModel
 from app.models.users import User as UserModel
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_paginate
+from app.response_cache import product_reviews_tag, response_cache
 from app.schemas import Product as ProductSchema
-from app.schemas import ProductCreate
+from app.schemas import (
+    ProductBatch,
+    ProductCreate,
+    ProductExpanded,
+    ProductFacets,
+    ProductImportReport,
+    ProductPage,
+    StockAdjustmentFailure,
+    StockAdjustmentReport,
+    StockAdjustmentRequest,
+    StockLevel,
+)
+from app.search import search_statement
+from app.serialization import (
+    JSONBytesResponse,
+    dump_json,
+    row_dicts,
+    schema_columns,
+)
 
 router = APIRouter(
     prefix="/products",
     tags=["products"],
 )
 
+SORT_KEYS = {
+    "id": (ProductModel.id,),
+    "price": (ProductModel.price, ProductModel.id),
+}
+
+# Сколько товаров можно запросить в /products/batch за раз
+MAX_BATCH_SIZE = 200
+
+PRODUCT_COLUMNS = schema_columns(ProductSchema, ProductModel)
+PRODUCT_RELATIONS = {
+    "category": ProductModel.category,
+    "seller": ProductModel.seller,
+}
+product_expand = expand_param(PRODUCT_RELATIONS)
+product_batch_adapter = TypeAdapter(ProductBatch)
+
+
+def product_filters(
+    category_id: int | None = None,
+    seller_id: int | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    in_stock: bool | None = None,
+) -> list[ColumnElement[bool]]:
+    """Собирает условия фильтрации каталога из параметров запроса."""
+    filters = []
+    if category_id is not None:
+        filters.append(ProductModel.category_id == category_id)
+    if seller_id is not None:
+        filters.append(ProductModel.seller_id == seller_id)
+    if min_price is not None:
+        filters.append(ProductModel.price >= min_price)
+    if max_price is not None:
+        filters.append(ProductModel.price <= max_price)
+    if in_stock is not None:
+        filters.append(
+            ProductModel.stock > 0 if in_stock else ProductModel.stock == 0
+        )
+    return filters
+
+
+def _active_category(category_id: int) -> ColumnElement[bool]:
+    """Условие для WHERE: категория существует и активна."""
+    return exists().where(
+        CategoryModel.id == category_id,
+        CategoryModel.is_active,
+    )
+
+
+@router.get("/", response_model=ProductPage)
+async def get_products(
+    is_active: bool = True,
+    sort: Literal["id", "price"] = "id",
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: list[ColumnElement[bool]] = Depends(product_filters),
+    expand: frozenset[str] = Depends(product_expand),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> ProductPage:
+    """Возвращает страницу каталога с фильтрами и курсорной пагинацией."""
+    stmt = (
+        select(ProductModel)
+        .options(*expand_options(PRODUCT_RELATIONS, expand))
+        .where(ProductModel.is_active == is_active, *filters)
+    )
+    items, next_cursor = await keyset_paginate(
+        db, stmt, SORT_KEYS[sort], cursor, limit
+    )
+    return ProductPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/search", response_model=ProductPage)
+async def search_products(
+    q: str = Query(min_length=1, max_length=200),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: list[ColumnElement[bool]] = Depends(product_filters),
+    expand: frozenset[str] = Depends(product_expand),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> ProductPage:
+    """Полнотекстовый поиск по названию и описанию, лучшие совпадения
+    первыми.
+    """
+    stmt, score = search_statement(db.get_bind().dialect.name, q)
+    if stmt is None:
+        return ProductPage(items=[], next_cursor=None)
+    items, next_cursor = await keyset_paginate(
+        db,
+        stmt.options(*expand_options(PRODUCT_RELATIONS, expand))
+        .where(ProductModel.is_active, *filters),
+        (score, ProductModel.id),
+        cursor,
+        limit,
+    )
+    return ProductPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/facets", response_model=ProductFacets)
+async def get_product_facets(
+    request: Request,
+    price_step: float = Query(100, ge=1),
+    filters: list[ColumnElement[bool]] = Depends(product_filters),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> JSONBytesResponse:
+    """Счётчики по категориям, гистограммы цен и рейтинга и наличие.
+
+    Считаются одним агрегирующим запросом и кэшируются на
+    FACETS_CACHE_TTL секунд без инвалидации при записи. Корзин цен не
+    больше MAX_PRICE_BUCKETS: при мелком price_step шаг укрупняется.
+    """
+    async def load() -> bytes:
+        facets = await load_facets(db, filters, price_step)
+        return facets.model_dump_json().encode()
+
+    return await response_cache.respond(
+        request, (), load, ttl=FACETS_CACHE_TTL
+    )
+
+
+def _product_ids(dialect: str, ids: list[int]) -> ColumnElement[bool]:
+    """Условие для WHERE: ID товара из списка.
+
+    В Postgres список передаётся одним параметром-массивом (= ANY), и
+    текст запроса не зависит от длины списка, а значит, подготовленный
+    запрос переиспользуется.
+    """
+    if dialect == "postgresql":
+        return ProductModel.id == any_(
+            bindparam("ids", ids, type_=ARRAY(Integer))
+        )
+    return ProductModel.id.in_(ids)
+
+
+@router.get("/batch", response_model=ProductBatch)
+async def get_products_batch(
+    ids: list[int] = Query(min_length=1, max_length=MAX_BATCH_SIZE),
+    expand: frozenset[str] = Depends(product_expand),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> JSONBytesResponse:
+    """Возвращает товары по списку ID одним запросом к базе.
+
+    Товары идут в порядке ids, повторы отбрасываются. Отсутствующие и
+    неактивные ID перечисляются отдельно. Без expand товары читаются
+    выборкой колонок, с expand - ORM-объектами со связями.
+    """
+    ids = list(dict.fromkeys(ids))
+    condition = _product_ids(db.get_bind().dialect.name, ids)
+    if expand:
+        products = await db.scalars(
+            select(ProductModel)
+            .options(*expand_options(PRODUCT_RELATIONS, expand))
+            .where(condition)
+        )
+        found = {
+            product.id: (product, product.is_active) for product in products
+        }
+    else:
+        rows = row_dicts(
+            await db.execute(select(*PRODUCT_COLUMNS).where(condition))
+        )
+        found = {row["id"]: (row, row["is_active"]) for row in rows}
+    items, missing, inactive = [], [], []
+    for product_id in ids:
+        row, is_active = found.get(product_id, (None, False))
+        if row is None:
+            missing.append(product_id)
+        elif not is_active:
+            inactive.append(product_id)
+        else:
+            items.append(row)
+    return JSONBytesResponse(dump_json(
+        product_batch_adapter,
+        {"items": items, "missing": missing, "inactive": inactive},
+    ))
+
+
+@router.get("/{product_id}", response_model=ProductExpanded)
+async def get_product(
+    product_id: int,
+    expand: frozenset[str] = Depends(product_expand),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> ProductExpanded:
+    """Возвращает активный товар по его ID."""
+    product = await db.scalar(
+        select(ProductModel)
+        .options(*expand_options(PRODUCT_RELATIONS, expand))
+        .where(ProductModel.id == product_id, ProductModel.is_active)
+    )
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return product
+
 
 @router.post(
         "/",
@@ -43,11 +276,107 @@ async def create_product(
         seller_id=current_user.id
     )
     db.add(db_product)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Product with this SKU already exists"
+        )
     await db.refresh(db_product)
     return db_product
 
 
+@router.post("/bulk", response_model=ProductImportReport)
+async def import_products(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller)
+) -> ProductImportReport:
+    """Массово создаёт или обновляет товары продавца по артикулу.
+
+    Принимает поток NDJSON (application/x-ndjson) или CSV (text/csv) с
+    заголовком. Строки проверяются и сохраняются пачками, поэтому память
+    не растёт с размером загрузки.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0]
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = iter_ndjson(request.stream())
+    elif content_type == "text/csv":
+        rows = iter_csv(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/x-ndjson or text/csv"
+        )
+    importer = ProductImporter(db, current_user.id)
+    async for row in rows:
+        await importer.add(row)
+    await importer.flush()
+    return importer.report
+
+
+@router.post("/stock", response_model=StockAdjustmentReport)
+async def adjust_stock(
+    adjustment: StockAdjustmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller)
+) -> StockAdjustmentReport:
+    """Атомарно меняет остатки нескольких товаров одним UPDATE.
+
+    Менять остаток может только продавец товара, списание проходит,
+    только если остатка хватает. Условия проверяются в WHERE, поэтому
+    параллельные списания не уводят остаток в минус.
+    """
+    deltas: dict[int, int] = {}
+    for item in adjustment.items:
+        deltas[item.product_id] = deltas.get(item.product_id, 0) + item.delta
+    delta = case(deltas, value=ProductModel.id)
+    result = await db.execute(
+        update(ProductModel)
+        .where(
+            ProductModel.id.in_(deltas),
+            ProductModel.is_active,
+            ProductModel.stock + delta >= 0,
+            ProductModel.seller_id == current_user.id,
+        )
+        .values(stock=ProductModel.stock + delta)
+        .returning(ProductModel.id, ProductModel.stock)
+        .execution_options(synchronize_session=False)
+    )
+    applied = [
+        StockLevel(product_id=product_id, stock=stock)
+        for product_id, stock in result.all()
+    ]
+    applied_ids = {level.product_id for level in applied}
+    failed = [
+        StockAdjustmentFailure(
+            line=line,
+            product_id=item.product_id,
+            detail="Insufficient stock, product inactive or not yours"
+        )
+        for line, item in enumerate(adjustment.items)
+        if item.product_id not in applied_ids
+    ]
+    if failed and adjustment.atomic:
+        await db.rollback()
+        # Откаченные строки тоже в failed: каждая строка пакета в отчёте
+        failed += [
+            StockAdjustmentFailure(
+                line=line,
+                product_id=item.product_id,
+                detail="Rolled back: batch failed"
+            )
+            for line, item in enumerate(adjustment.items)
+            if item.product_id in applied_ids
+        ]
+        failed.sort(key=lambda failure: failure.line)
+        applied = []
+    else:
+        await db.commit()
+    return StockAdjustmentReport(applied=applied, failed=failed)
+
+
 @router.put("/{product_id}", response_model=ProductSchema)
 async def update_product(
     product_id: int,
@@ -58,37 +387,49 @@ async def update_product(
     """Обновляет товар, если он
     принадлежит текущему продавцу (только для 'seller').
     """
-    result = await db.scalars(
-        select(ProductModel).where(ProductModel.id == product_id)
-    )
-    db_product = result.first()
-    if not db_product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
+    values = product.model_dump()
+    # Без sku в запросе артикул не трогаем: по нему импорт находит товар
+    if "sku" not in product.model_fields_set:
+        del values["sku"]
+    try:
+        db_product = await db.scalar(
+            update(ProductModel)
+            .where(
+                ProductModel.id == product_id,
+                ProductModel.is_active,
+                ProductModel.seller_id == current_user.id,
+                _active_category(product.category_id),
+            )
+            .values(**values)
+            .returning(ProductModel)
         )
-    if db_product.seller_id != current_user.id:
+    except IntegrityError:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only update your own products"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Product with this SKU already exists"
         )
-    category_result = await db.scalars(
-        select(CategoryModel).where(
-            CategoryModel.id == product.category_id,
-            CategoryModel.is_active
+    if db_product is None:
+        seller_id = await db.scalar(
+            select(ProductModel.seller_id).where(
+                ProductModel.id == product_id,
+                ProductModel.is_active,
+            )
         )
-    )
-    if not category_result.first():
+        if seller_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        if seller_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only update your own products"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Category not found or inactive"
         )
-    await db.execute(
-        update(ProductModel).where(
-            ProductModel.id == product_id).values(**product.model_dump())
-    )
     await db.commit()
-    await db.refresh(db_product)
     return db_product
 
 
@@ -101,27 +442,33 @@ async def delete_product(
     """Выполняет мягкое удаление товара,
     если он принадлежит текущему продавцу (только для 'seller').
     """
-    result = await db.scalars(
-        select(ProductModel).where(
+    product = await db.scalar(
+        update(ProductModel)
+        .where(
             ProductModel.id == product_id,
             ProductModel.is_active,
+            ProductModel.seller_id == current_user.id,
         )
+        .values(is_active=False)
+        .returning(ProductModel)
     )
-    product = result.first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found or inactive",
+    if product is None:
+        seller_id = await db.scalar(
+            select(ProductModel.seller_id).where(
+                ProductModel.id == product_id,
+                ProductModel.is_active,
+            )
         )
-    if product.seller_id != current_user.id:
+        if seller_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found or inactive",
+            )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only delete your own products"
         )
-    await db.execute(
-        update(ProductModel).where(
-            ProductModel.id == product_id).values(is_active=False)
-    )
     await db.commit()
-    await db.refresh(product)
+    # Отзывы снятого с продажи товара отдаются как 404
+    await response_cache.invalidate(product_reviews_tag(product_id))
     return product
@@ -1,61 +1,291 @@
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Float, Insert, Update, case, cast, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_admin, get_current_buyer
-from app.db_depends import get_async_db
+from app.database import upsert_insert
+from app.db_depends import get_async_db, get_async_read_db, read_session
 from app.models.products import Product
+from app.models.review_stats import ProductReviewStats
 from app.models.reviews import Review
 from app.models.users import User as UserModel
-from app.schemas import ReviewCreate, ReviewResponse
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_paginate
+from app.response_cache import product_reviews_tag, response_cache
+from app.schemas import (
+    ReviewCreate,
+    ReviewPage,
+    ReviewResponse,
+    ReviewSummary,
+)
+from app.serialization import (
+    JSONBytesResponse,
+    dump_json,
+    schema_columns,
+)
 
 router = APIRouter(
     tags=['reviews'],
 )
 
 
+def rating_counters(grade_delta: int, count_delta: int) -> dict:
+    """Значения для UPDATE, сдвигающие счётчики отзывов товара.
+
+    Рейтинг пересчитывается из новых значений счётчиков в том же
+    UPDATE, поэтому конкурентные отзывы не теряют обновления.
+    """
+    rating_sum = Product.rating_sum + grade_delta
+    review_count = Product.review_count + count_delta
+    return {
+        'rating_sum': rating_sum,
+        'review_count': review_count,
+        'rating': case(
+            (review_count > 0, cast(rating_sum, Float) / review_count),
+            else_=0,
+        ),
+    }
+
+
+STREAM_BATCH_SIZE = 1000
+
+# Быстрый путь списков: колонки вместо ORM-объектов и готовые адаптеры
+REVIEW_COLUMNS = schema_columns(ReviewResponse, Review)
+review_page_adapter = TypeAdapter(ReviewPage)
+
+# Порядок отзывов товара; все ключи идут по убыванию, поэтому для
+# «сначала низкие» оценка берётся со знаком минус (с меткой, чтобы
+# не совпасть по имени с колонкой grade в выборке)
+REVIEW_SORT_KEYS = {
+    'newest': (Review.comment_date, Review.id),
+    'highest': (Review.grade, Review.comment_date, Review.id),
+    'lowest': (
+        (-Review.grade).label('grade_desc'),
+        Review.comment_date,
+        Review.id,
+    ),
+}
+
+GRADE_COLUMNS = {
+    grade: getattr(ProductReviewStats, f'grade_{grade}')
+    for grade in range(1, 6)
+}
+
+
+def add_to_review_stats(
+    dialect: str,
+    product_id: int,
+    grade: int,
+    reviewed_at: datetime,
+) -> Insert:
+    """INSERT ... ON CONFLICT, добавляющий отзыв в сводку товара."""
+    stmt = upsert_insert(dialect, ProductReviewStats)
+    grade_column = GRADE_COLUMNS[grade]
+    stmt = stmt.values(
+        product_id=product_id,
+        total=1,
+        last_review_at=reviewed_at,
+        **{grade_column.key: 1},
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[ProductReviewStats.product_id],
+        set_={
+            grade_column.key: grade_column + 1,
+            'total': ProductReviewStats.total + 1,
+            'last_review_at': case(
+                (
+                    ProductReviewStats.last_review_at
+                    > stmt.excluded.last_review_at,
+                    ProductReviewStats.last_review_at,
+                ),
+                else_=stmt.excluded.last_review_at,
+            ),
+        },
+    )
+
+
+def remove_from_review_stats(product_id: int, grade: int) -> Update:
+    """UPDATE, убирающий отзыв из сводки товара.
+
+    Дата последнего отзыва пересчитывается по индексу
+    (product_id, is_active, comment_date), поэтому удалённый отзыв
+    должен быть уже помечен неактивным.
+    """
+    grade_column = GRADE_COLUMNS[grade]
+    return (
+        update(ProductReviewStats)
+        .where(ProductReviewStats.product_id == product_id)
+        .values(
+            total=ProductReviewStats.total - 1,
+            last_review_at=select(func.max(Review.comment_date))
+            .where(Review.product_id == product_id, Review.is_active)
+            .scalar_subquery(),
+            **{grade_column.key: grade_column - 1},
+        )
+    )
+
+
 @router.get(
     '/reviews/',
-    response_model=List[ReviewResponse],
+    response_model=ReviewPage,
 )
 async def get_all_active_reviews(
-    db: AsyncSession = Depends(get_async_db)
-) -> List[ReviewResponse]:
-    """Получает список всех активных отзывов."""
-    result = await db.scalars(
-        select(Review)
-        .where(Review.is_active)
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+) -> JSONBytesResponse:
+    """Получает страницу активных отзывов в порядке их ID."""
+    items, next_cursor = await keyset_paginate(
+        db,
+        select(*REVIEW_COLUMNS).where(Review.is_active),
+        (Review.id,),
+        cursor,
+        limit,
+    )
+    return JSONBytesResponse(dump_json(
+        review_page_adapter,
+        {'items': items, 'next_cursor': next_cursor},
+    ))
+
+
+async def _stream_active_reviews(request: Request) -> AsyncIterator[str]:
+    """Выгружает активные отзывы пачками через серверный курсор."""
+    async with read_session(request) as session:
+        result = await session.stream_scalars(
+            select(Review)
+            .where(Review.is_active)
+            .order_by(Review.id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for batch in result.partitions():
+            yield ''.join(
+                ReviewResponse.model_validate(review).model_dump_json() + '\n'
+                for review in batch
+            )
+
+
+@router.get(
+    '/reviews/stream',
+    response_class=StreamingResponse,
+)
+async def stream_all_active_reviews(request: Request) -> StreamingResponse:
+    """Выгружает все активные отзывы в формате NDJSON.
+
+    Сессия открывается внутри генератора, так как ответ отдаётся уже
+    после завершения зависимостей обработчика.
+    """
+    return StreamingResponse(
+        _stream_active_reviews(request),
+        media_type='application/x-ndjson',
     )
-    return result.all()
 
 
 @router.get(
     '/products/{product_id}/reviews/',
-    response_model=List[ReviewResponse],
+    response_model=ReviewPage,
 )
 async def get_reviews_for_product(
     product_id: int,
+    request: Request,
+    sort: Literal['newest', 'highest', 'lowest'] = 'newest',
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: AsyncSession = Depends(get_async_db),
-) -> List[ReviewResponse]:
-    """Получает список всех отзывов на данный товар."""
-    request_product = await db.scalars(
-        select(Product)
-        .where(Product.id == product_id)
-        .where(Product.is_active)
-    )
-    if not request_product.first():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail='Товар не найден'
+) -> JSONBytesResponse:
+    """Получает страницу отзывов на товар в выбранном порядке.
+
+    Промах кэша читается с основной базы, см. ResponseCache.respond().
+    """
+    async def load() -> bytes:
+        request_product = await db.scalar(
+            select(Product.id)
+            .where(Product.id == product_id)
+            .where(Product.is_active)
         )
-    result = await db.scalars(
-        select(Review)
-        .where(Review.product_id == product_id)
-        .where(Review.is_active)
+        if request_product is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Товар не найден'
+            )
+        items, next_cursor = await keyset_paginate(
+            db,
+            select(*REVIEW_COLUMNS)
+            .where(Review.product_id == product_id)
+            .where(Review.is_active),
+            REVIEW_SORT_KEYS[sort],
+            cursor,
+            limit,
+            descending=True,
+        )
+        return dump_json(
+            review_page_adapter,
+            {'items': items, 'next_cursor': next_cursor},
+        )
+
+    return await response_cache.respond(
+        request, (product_reviews_tag(product_id),), load
+    )
+
+
+@router.get(
+    '/products/{product_id}/reviews/summary',
+    response_model=ReviewSummary,
+)
+async def get_review_summary(
+    product_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+) -> JSONBytesResponse:
+    """Средняя оценка и распределение отзывов товара по оценкам.
+
+    Промах кэша читается с основной базы, см. ResponseCache.respond().
+    """
+    async def load() -> bytes:
+        row = (await db.execute(
+            select(Product.id, ProductReviewStats)
+            .outerjoin(
+                ProductReviewStats,
+                ProductReviewStats.product_id == Product.id,
+            )
+            .where(Product.id == product_id)
+            .where(Product.is_active)
+        )).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Товар не найден'
+            )
+        stats = row.ProductReviewStats
+        grades = {
+            grade: getattr(stats, column.key) if stats else 0
+            for grade, column in GRADE_COLUMNS.items()
+        }
+        total = sum(grades.values())
+        return ReviewSummary(
+            product_id=product_id,
+            total=total,
+            average=round(
+                sum(grade * count for grade, count in grades.items())
+                / total, 2
+            ) if total else 0,
+            grades=grades,
+            last_review_at=stats.last_review_at if stats else None,
+        ).model_dump_json().encode()
+
+    return await response_cache.respond(
+        request, (product_reviews_tag(product_id),), load
     )
-    return result.all()
 
 
 @router.post(
@@ -69,36 +299,32 @@ async def create_review(
     current_user: UserModel = Depends(get_current_buyer)
 ) -> ReviewResponse:
     """Создает новый отзыв на товар."""
-    prepare_product = await db.scalar(
-        select(Product)
+    updated_product = await db.scalar(
+        update(Product)
         .where(Product.id == review.product_id)
         .where(Product.is_active)
+        .values(**rating_counters(review.grade, 1))
+        .returning(Product.id)
     )
-    if not prepare_product:
+    if updated_product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Продукт не найден'
         )
-    product_reviews = await db.scalars(
-        select(Review.grade)
-        .where(Review.product_id == prepare_product.id)
-        .where(Review.is_active)
-    )
-    result_reviews = product_reviews.all()
-    sum_raiting = (
-        sum(result_reviews) + review.grade
-        ) / (len(result_reviews) + 1)
-    await db.execute(
-        update(Product)
-        .where(Product.id == review.product_id)
-        .values(rating=sum_raiting)
-    )
     new_review = Review(
         **review.model_dump(),
         user_id=current_user.id,
+        comment_date=datetime.now(),
     )
     db.add(new_review)
+    await db.execute(add_to_review_stats(
+        db.get_bind().dialect.name,
+        review.product_id,
+        review.grade,
+        new_review.comment_date,
+    ))
     await db.commit()
+    await response_cache.invalidate(product_reviews_tag(review.product_id))
     await db.refresh(new_review)
     return new_review
 
@@ -112,37 +338,28 @@ async def delete_review(
     current_user: UserModel = Depends(get_current_admin),
 ) -> dict:
     """Удаляет отзыв на товар по ID."""
-    request_review = await db.scalar(
-        select(Review)
+    deleted_review = (await db.execute(
+        update(Review)
         .where(Review.id == review_id)
         .where(Review.is_active)
-    )
-    if not request_review:
+        .values(is_active=False)
+        .returning(Review.product_id, Review.grade)
+    )).first()
+    if deleted_review is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Отзыв не найден или не активен'
         )
-    product_reviews = await db.scalars(
-        select(Review.grade)
-        .where(Review.product_id == request_review.product_id)
-        .where(Review.is_active)
-        .where(Review.id != request_review.id)
-    )
-    result_reviews = product_reviews.all()
-    if not result_reviews:
-        sum_raiting = 0.00
-    else:
-        sum_raiting = sum(result_reviews) / len(result_reviews)
     await db.execute(
         update(Product)
-        .where(Product.id == request_review.product_id)
-        .values(rating=sum_raiting)
+        .where(Product.id == deleted_review.product_id)
+        .values(**rating_counters(-deleted_review.grade, -1))
     )
-    if current_user:
-        await db.execute(
-            update(Review)
-            .where(Review.id == review_id)
-            .values(is_active=False)
-        )
+    await db.execute(remove_from_review_stats(
+        deleted_review.product_id, deleted_review.grade
+    ))
     await db.commit()
+    await response_cache.invalidate(
+        product_reviews_tag(deleted_review.product_id)
+    )
     return {"message": "Review deleted"}
@@ -1,23 +1,52 @@
-import jwt
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import (
     create_access_token,
     create_refresh_token,
-    hash_password,
-    verify_password,
+    decode_refresh_token,
+    get_current_admin,
+    hash_password_async,
+    invalidate_principal,
+    load_principal,
+    verify_password_async,
+)
+from app.config import (
+    LOGIN_IP_BURST,
+    LOGIN_IP_PER_MINUTE,
+    LOGIN_USER_BURST,
+    LOGIN_USER_PER_MINUTE,
 )
-from app.config import ALGORITHM, SECRET_KEY
 from app.db_depends import get_async_db
 from app.models.users import User as UserModel
+from app.rate_limit import RateLimiter
 from app.schemas import User as UserSchema
-from app.schemas import UserCreate
+from app.schemas import UserCreate, UserUpdate
+from app.token_revocation import is_revoked_locally, revoke_refresh_token
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+login_ip_limit = RateLimiter("login:ip", LOGIN_IP_PER_MINUTE, LOGIN_IP_BURST)
+login_user_limit = RateLimiter(
+    "login:user", LOGIN_USER_PER_MINUTE, LOGIN_USER_BURST
+)
+
+
+async def limit_login_attempts(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+) -> None:
+    """Ограничивает попытки входа с одного IP и на один email.
+
+    Выполняется до обработчика, поэтому отклонённая попытка не доходит
+    до проверки пароля bcrypt.
+    """
+    await login_ip_limit(request)
+    await login_user_limit.check(form_data.username.strip().lower())
+
 
 @router.post(
         "/",
@@ -29,24 +58,52 @@ async def create_user(
     db: AsyncSession = Depends(get_async_db)
 ) -> UserSchema:
     """Регистрирует нового пользователя с ролью 'buyer' или 'seller'."""
-    result = await db.scalars(
-        select(UserModel)
-        .where(UserModel.email == user.email)
-    )
-    if result.first():
+    hashed_password = await hash_password_async(user.password)
+    try:
+        db_user = await db.scalar(
+            insert(UserModel)
+            .values(
+                email=user.email,
+                hashed_password=hashed_password,
+                role=user.role
+            )
+            .returning(UserModel)
+        )
+    except IntegrityError:
+        # Уникальность email проверяет индекс, без предварительного SELECT
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="Email already registered")
-    db_user = UserModel(
-        email=user.email,
-        hashed_password=hash_password(user.password),
-        role=user.role
+    await db.commit()
+    return db_user
+
+
+@router.patch("/{user_id}", response_model=UserSchema)
+async def update_user(
+    user_id: int,
+    user: UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_admin)
+) -> UserSchema:
+    """Меняет роль или активность пользователя (только для 'admin')."""
+    values = user.model_dump(exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Nothing to update")
+    db_user = await db.scalar(
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(**values)
+        .returning(UserModel)
     )
-    db.add(db_user)
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
     await db.commit()
+    invalidate_principal(user_id)
     return db_user
 
 
-@router.post("/token")
+@router.post("/token", dependencies=[Depends(limit_login_attempts)])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_async_db)
@@ -57,7 +114,7 @@ async def login(
         .where(UserModel.email == form_data.username)
     )
     user = result.first()
-    if not user or not verify_password(
+    if not user or not await verify_password_async(
         form_data.password,
         user.hashed_password,
     ):
@@ -84,27 +141,40 @@ async def refresh_token(
     refresh_token: str,
     db: AsyncSession = Depends(get_async_db)
 ) -> dict:
-    """Обновляет access_token с помощью refresh_token."""
+    """Обменивает refresh_token на новую пару токенов.
+
+    Старый refresh_token отзывается (ротация): повторно его предъявить
+    нельзя. Уже отозванный в этом процессе токен отклоняется без
+    обращения к базе, пользователь берётся из кэша.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate refresh token",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except jwt.exceptions:
+    payload = decode_refresh_token(refresh_token)
+    if is_revoked_locally(payload["jti"]):
         raise credentials_exception
-    result = await db.scalars(
-        select(UserModel)
-        .where(UserModel.email == email, UserModel.is_active)
-    )
-    user = result.first()
-    if user is None:
+    user = await load_principal(db, payload["sub"], payload["id"])
+    if user is None or not await revoke_refresh_token(db, payload):
         raise credentials_exception
-    access_token = create_access_token(
-        data={"sub": user.email, "role": user.role, "id": user.id}
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    await db.commit()
+    data = {"sub": user.email, "role": user.role, "id": user.id}
+    return {
+        "access_token": create_access_token(data=data),
+        "refresh_token": create_refresh_token(data=data),
+        "token_type": "bearer"
+    }
+
+
+@router.post("/logout")
+async def logout(
+    refresh_token: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> dict:
+    """Отзывает refresh_token: новые токены по нему больше не выдаются."""
+    payload = decode_refresh_token(refresh_token)
+    if not is_revoked_locally(payload["jti"]):
+        await revoke_refresh_token(db, payload)
+        await db.commit()
+    return {"message": "Logged out"}
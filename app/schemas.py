@@ -1,8 +1,32 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
+from sqlalchemy import inspect
+
+
+class ExpandableModel(BaseModel):
+    """Схема ответа с раскрываемыми связями (?expand=).
+
+    Связи, не загруженные у ORM-объекта, остаются None: чтение такого
+    атрибута в асинхронной сессии запустило бы ленивую загрузку.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_unloaded(cls, data: Any) -> Any:
+        state = inspect(data, raiseerr=False)
+        if state is None or not hasattr(state, "unloaded"):
+            return data
+        unloaded = state.unloaded
+        return {
+            name: getattr(data, name)
+            for name in cls.model_fields
+            if name not in unloaded and hasattr(data, name)
+        }
 
 
 class CategoryCreate(BaseModel):
@@ -34,6 +58,19 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryExpanded(Category, ExpandableModel):
+    """Категория с родителем и активными подкатегориями (?expand=)."""
+
+    parent: Optional[Category] = Field(
+        None,
+        description="Родительская категория, если запрошена"
+    )
+    children: Optional[list[Category]] = Field(
+        None,
+        description="Активные подкатегории, если запрошены"
+    )
+
+
 class ProductCreate(BaseModel):
     """Модель для создания и обновления товара.
     Используется в POST и PUT запросах.
@@ -59,6 +96,42 @@ class ProductCreate(BaseModel):
     category_id: int = Field(
         description="ID категории, к которой относится товар"
     )
+    sku: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=64,
+        description="Артикул продавца (до 64 символов)"
+    )
+
+
+class ProductImportRow(ProductCreate):
+    """Строка массового импорта товаров: артикул обязателен."""
+
+    sku: str = Field(min_length=1, max_length=64,
+                     description="Артикул продавца (1-64 символа)")
+
+
+class ProductImportError(BaseModel):
+    """Ошибка в одной строке массового импорта."""
+
+    row: int = Field(description="Номер строки данных, начиная с 1")
+    sku: Optional[str] = Field(None, description="Артикул из строки")
+    errors: list[str] = Field(description="Описание ошибок")
+
+
+class ProductImportReport(BaseModel):
+    """Итог массового импорта товаров."""
+
+    processed: int = Field(description="Сколько строк прочитано")
+    upserted: int = Field(description="Сколько товаров создано/обновлено")
+    failed: int = Field(description="Сколько строк отклонено")
+    errors: list[ProductImportError] = Field(
+        description="Ошибки по строкам (не больше MAX_REPORTED_ERRORS)"
+    )
+    errors_truncated: bool = Field(
+        False,
+        description="Часть ошибок не вошла в отчёт"
+    )
 
 
 class Product(BaseModel):
@@ -80,11 +153,139 @@ class Product(BaseModel):
     )
     stock: int = Field(description="Количество товара на складе")
     category_id: int = Field(description="ID категории")
+    seller_id: int = Field(description="ID продавца")
+    sku: Optional[str] = Field(None, description="Артикул продавца")
     is_active: bool = Field(description="Активность товара")
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class Seller(BaseModel):
+    """Продавец товара в раскрытом ответе.
+
+    Раскрытие доступно без аутентификации, поэтому персональные данные
+    (email) сюда не входят.
+    """
+
+    id: int = Field(description="ID продавца")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductExpanded(Product, ExpandableModel):
+    """Товар с категорией и продавцом (?expand=category,seller)."""
+
+    category: Optional[Category] = Field(
+        None,
+        description="Категория товара, если запрошена"
+    )
+    seller: Optional[Seller] = Field(
+        None,
+        description="Продавец товара, если запрошен"
+    )
+
+
+class ProductPage(BaseModel):
+    """Страница каталога товаров с курсором на следующую страницу."""
+
+    items: list[ProductExpanded] = Field(description="Товары на странице")
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Курсор следующей страницы, если она есть"
+    )
+
+
+class ProductBatch(BaseModel):
+    """Товары по списку ID в порядке запроса."""
+
+    items: list[ProductExpanded] = Field(
+        description="Найденные активные товары"
+    )
+    missing: list[int] = Field(description="ID, для которых товара нет")
+    inactive: list[int] = Field(description="ID неактивных товаров")
+
+
+class CategoryFacet(BaseModel):
+    """Число товаров в категории и во всём её поддереве."""
+
+    category_id: int = Field(description="ID категории")
+    count: int = Field(description="Товаров непосредственно в категории")
+    total: int = Field(description="Товаров в категории и подкатегориях")
+
+
+class PriceFacet(BaseModel):
+    """Корзина гистограммы цен: товары с ценой в [min_price, max_price)."""
+
+    min_price: float = Field(description="Нижняя граница, включительно")
+    max_price: float = Field(description="Верхняя граница, не включительно")
+    count: int = Field(description="Число товаров")
+
+
+class RatingFacet(BaseModel):
+    """Корзина гистограммы рейтинга: рейтинг в [rating, rating + 1)."""
+
+    rating: int = Field(description="Целая часть рейтинга")
+    count: int = Field(description="Число товаров")
+
+
+class ProductFacets(BaseModel):
+    """Фасеты каталога для набора фильтров."""
+
+    total: int = Field(description="Всего товаров под фильтрами")
+    in_stock: int = Field(description="Товаров в наличии")
+    out_of_stock: int = Field(description="Товаров не в наличии")
+    categories: list[CategoryFacet] = Field(
+        description="Счётчики по категориям, с учётом поддеревьев"
+    )
+    prices: list[PriceFacet] = Field(description="Гистограмма цен")
+    ratings: list[RatingFacet] = Field(description="Гистограмма рейтинга")
+
+
+class StockAdjustment(BaseModel):
+    """Изменение остатка одного товара: отрицательное - списание."""
+
+    product_id: int = Field(description="ID товара")
+    delta: int = Field(description="На сколько изменить остаток")
+
+
+class StockAdjustmentRequest(BaseModel):
+    """Пакет изменений остатков, применяемый одним запросом к базе."""
+
+    items: list[StockAdjustment] = Field(
+        min_length=1,
+        max_length=500,
+        description="Изменения остатков (1-500 строк)"
+    )
+    atomic: bool = Field(
+        False,
+        description="Откатить весь пакет, если не прошла хотя бы одна строка"
+    )
+
+
+class StockLevel(BaseModel):
+    """Остаток товара после изменения."""
+
+    product_id: int = Field(description="ID товара")
+    stock: int = Field(description="Новый остаток")
+
+
+class StockAdjustmentFailure(BaseModel):
+    """Строка пакета, которую не удалось применить."""
+
+    line: int = Field(description="Номер строки в пакете, начиная с 0")
+    product_id: int = Field(description="ID товара")
+    detail: str = Field(description="Причина отказа")
+
+
+class StockAdjustmentReport(BaseModel):
+    """Результат применения пакета изменений остатков."""
+
+    applied: list[StockLevel] = Field(description="Применённые изменения")
+    failed: list[StockAdjustmentFailure] = Field(
+        description="Строки, которые не удалось применить"
+    )
+
+
 class UserCreate(BaseModel):
     """Схема создания нового пользователя."""
 
@@ -100,6 +301,20 @@ class UserCreate(BaseModel):
     )
 
 
+class UserUpdate(BaseModel):
+    """Схема изменения роли или активности пользователя администратором."""
+
+    role: Optional[str] = Field(
+        None,
+        pattern="^(buyer|seller|admin)$",
+        description="Новая роль: 'buyer', 'admin', или 'seller'"
+    )
+    is_active: Optional[bool] = Field(
+        None,
+        description="Активность пользователя"
+    )
+
+
 class User(BaseModel):
     """Схема для получения данных пользователя."""
 
@@ -160,3 +375,43 @@ class ReviewResponse(BaseModel):
         ...,
         description='Активность отзыва'
     )
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ReviewPage(BaseModel):
+    """Страница отзывов с курсором на следующую страницу."""
+
+    items: list[ReviewResponse] = Field(
+        ...,
+        description='Отзывы на странице',
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description='Курсор следующей страницы, если она есть',
+    )
+
+
+class ReviewSummary(BaseModel):
+    """Сводка отзывов товара: средняя оценка и распределение по оценкам."""
+
+    product_id: int = Field(
+        ...,
+        description='ID товара',
+    )
+    total: int = Field(
+        ...,
+        description='Число активных отзывов',
+    )
+    average: float = Field(
+        ...,
+        description='Средняя оценка, 0 при отсутствии отзывов',
+    )
+    grades: dict[int, int] = Field(
+        ...,
+        description='Число отзывов по каждой оценке от 1 до 5',
+    )
+    last_review_at: Optional[datetime] = Field(
+        None,
+        description='Дата последнего активного отзыва',
+    )
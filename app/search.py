@@ -0,0 +1,66 @@
+import re
+
+from sqlalchemy import (
+    Float,
+    Select,
+    column,
+    func,
+    literal_column,
+    select,
+    table,
+)
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Product as ProductModel
+
+# Конфигурация без стемминга: каталог смешивает русские и английские слова
+SEARCH_CONFIG = "simple"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Внешняя таблица FTS5 из SQLITE_SEARCH_DDL, rowid совпадает с products.id
+products_fts = table("products_fts", column("rowid"))
+
+
+def _fts5_query(q: str) -> str | None:
+    """Превращает пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы и спецсимволы
+    FTS5 из строки поиска не интерпретируются. Слова объединяются по И.
+    """
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+def search_statement(
+    dialect: str,
+    q: str,
+) -> tuple[Select | None, ColumnElement]:
+    """Строит выборку товаров по строке поиска и выражение релевантности.
+
+    Чем меньше значение релевантности, тем выше товар в выдаче, поэтому
+    пару (релевантность, id) можно пагинировать по возрастанию.
+    Если в строке нет ни одного слова, вместо выборки возвращается None.
+    """
+    if dialect == "postgresql":
+        vector = literal_column("products.search_vector")
+        query = func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q
+        )
+        score = -func.ts_rank(vector, query, type_=Float)
+        return select(ProductModel).where(vector.op("@@")(query)), score
+
+    # В FTS5 имя таблицы служит и колонкой для MATCH и bm25()
+    fts = literal_column("products_fts")
+    score = func.bm25(fts, type_=Float)
+    match = _fts5_query(q)
+    if match is None:
+        return None, score
+    stmt = (
+        select(ProductModel)
+        .join(products_fts, products_fts.c.rowid == ProductModel.id)
+        .where(fts.op("MATCH")(match))
+    )
+    return stmt, score
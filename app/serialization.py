@@ -0,0 +1,51 @@
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Result
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+class JSONBytesResponse(Response):
+    """Ответ с уже готовым JSON в байтах.
+
+    Обработчик, вернувший его, минует проверку по response_model и
+    jsonable_encoder: сериализация целиком выполняется в pydantic-core.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: bytes) -> bytes:
+        """Отдаёт байты без повторного кодирования."""
+        return content
+
+
+def schema_columns(
+    schema: type[BaseModel],
+    model: type,
+) -> list[InstrumentedAttribute]:
+    """Колонки модели для полей схемы ответа.
+
+    Выборка только этих колонок возвращает строки-кортежи без создания
+    ORM-объектов. Поля без одноимённой колонки остаются со значением
+    по умолчанию из схемы.
+    """
+    return [
+        getattr(model, name)
+        for name in schema.model_fields
+        if isinstance(getattr(model, name, None), InstrumentedAttribute)
+    ]
+
+
+def row_dicts(result: Result) -> list[dict]:
+    """Строки выборки колонок в виде обычных словарей.
+
+    pydantic-core читает dict заметно быстрее, чем RowMapping.
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    """Проверяет словари строк готовым адаптером и сразу отдаёт байты JSON."""
+    return adapter.dump_json(adapter.validate_python(data))
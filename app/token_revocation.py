@@ -0,0 +1,66 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import LRUTTLCache
+from app.config import REVOKED_TOKEN_CACHE_SIZE, REVOKED_TOKEN_PRUNE_SECONDS
+from app.database import upsert_insert
+from app.models.revoked_tokens import RevokedToken
+
+# Отозванные jti, известные этому процессу: ключ - 8 байт хеша jti в
+# виде int, запись живёт до истечения токена. С узлом OrderedDict,
+# кортежем (срок, значение) и float запись стоит около 220 байт, а не 8.
+# Источник истины - таблица revoked_tokens, кэш лишь отсекает повторы
+# без запроса к базе
+revoked_token_cache = LRUTTLCache(maxsize=REVOKED_TOKEN_CACHE_SIZE, ttl=0)
+_next_prune = 0.0
+
+
+def _jti_key(jti: str) -> int:
+    digest = hashlib.blake2b(jti.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def is_revoked_locally(jti: str) -> bool:
+    """Проверяет, видел ли этот процесс отзыв токена.
+
+    False ничего не гарантирует: токен мог отозвать другой процесс.
+    """
+    return revoked_token_cache.get(_jti_key(jti)) is not None
+
+
+async def revoke_refresh_token(db: AsyncSession, payload: dict) -> bool:
+    """Отзывает refresh-токен по payload; коммит - за вызывающим.
+
+    Один INSERT ... ON CONFLICT DO NOTHING RETURNING одновременно
+    проверяет и отзывает токен, поэтому из двух конкурентных ротаций
+    одного токена успешна только одна. Возвращает False, если токен
+    уже был отозван.
+    """
+    global _next_prune
+    stmt = upsert_insert(db.get_bind().dialect.name, RevokedToken).values(
+        jti=payload["jti"],
+        user_id=payload["id"],
+        expires_at=_utc(payload["exp"]),
+    ).on_conflict_do_nothing(
+        index_elements=[RevokedToken.jti],
+    ).returning(RevokedToken.jti)
+    revoked = await db.scalar(stmt) is not None
+    revoked_token_cache.set(
+        _jti_key(payload["jti"]), True, ttl=payload["exp"] - time.time()
+    )
+    if time.monotonic() >= _next_prune:
+        _next_prune = time.monotonic() + REVOKED_TOKEN_PRUNE_SECONDS
+        await db.execute(
+            delete(RevokedToken).where(
+                RevokedToken.expires_at < _utc(time.time())
+            )
+        )
+    return revoked
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack
+
+import httpx
+from fastapi import FastAPI
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import async_engine, replica_set
+from app.pagination import DEFAULT_PAGE_SIZE
+
+# Частые запросы на чтение: путь и параметры. Ответ не важен (запрос к
+# несуществующему товару тоже годится), важно пройти маршрут целиком
+HOT_REQUESTS = (
+    ("/products/", {"limit": DEFAULT_PAGE_SIZE}),
+    ("/products/0", {}),
+    ("/products/batch", {"ids": 0}),
+    ("/products/search", {"q": "warmup"}),
+    ("/products/facets", {}),
+    ("/categories/", {}),
+    ("/reviews/", {"limit": DEFAULT_PAGE_SIZE}),
+    ("/products/0/reviews/", {}),
+)
+
+
+async def open_connections(engine: AsyncEngine, count: int) -> None:
+    """Открывает count соединений одновременно и возвращает их в пул.
+
+    Больше размера пула открывать бессмысленно: лишние соединения
+    закрываются сразу при возврате.
+    """
+    pool_size = getattr(engine.pool, "size", None)
+    if pool_size is not None:
+        count = min(count, pool_size())
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(
+            stack.enter_async_context(engine.connect())
+            for _ in range(count)
+        ))
+
+
+async def run_hot_requests(app: FastAPI, concurrency: int) -> None:
+    """Прогоняет HOT_REQUESTS через маршруты приложения.
+
+    Запросы идут мимо middleware, поэтому не попадают ни в метрики, ни
+    в журнал. Каждый запрос выполняется concurrency раз одновременно:
+    так выражения компилируются один раз и подготавливаются на всех
+    соединениях пула (asyncpg держит подготовленные выражения для
+    каждого соединения отдельно).
+    """
+    transport = httpx.ASGITransport(app=app.router, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://warmup",
+    ) as client:
+        for path, params in HOT_REQUESTS:
+            await asyncio.gather(*(
+                client.get(path, params=params)
+                for _ in range(max(concurrency, 1))
+            ))
+
+
+async def warm_up(app: FastAPI, connections: int) -> None:
+    """Прогревает пулы соединений, запросы и схему OpenAPI.
+
+    Ошибка прогрева (например, база ещё недоступна) не мешает старту:
+    она пишется в лог, а недогретое прогреется первыми запросами.
+    """
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            open_connections(engine, connections)
+            for engine in (async_engine, *replica_set.engines)
+        ))
+        await run_hot_requests(app, connections)
+    except Exception as exc:
+        logger.warning("Warm-up failed: {!r}", exc)
+    app.openapi()
+    logger.info("Warm-up finished in {:.3f}s", time.perf_counter() - started)
@@ -0,0 +1,424 @@
+"""Нагрузочный бенчмарк эндпоинтов API на локальной базе.
+
+Поднимает app.main:app в том же процессе (через httpx.ASGITransport),
+создаёт схему в локальной базе (по умолчанию SQLite через aiosqlite),
+заполняет её тестовыми данными и прогоняет каждый сценарий с заданной
+конкурентностью. Для каждого эндпоинта считаются p50/p95/p99 и RPS,
+результаты пишутся в JSON, который можно сравнить с прошлым запуском.
+
+Запуск::
+
+    python -m benchmarks.endpoints --products 20000 --reviews 50000
+    python -m benchmarks.endpoints --compare benchmarks/results/abc1234.json
+
+Для Postgres передайте --database-url с пустой базой: схема создаётся
+через Base.metadata.create_all, существующие таблицы пересоздаются.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class Scenario:
+    """Один эндпоинт и способ построить запрос к нему."""
+
+    name: str
+    method: str
+    path: Callable[["Context"], str]
+    role: str | None = None
+    params: Callable[["Context"], dict] | None = None
+    json: Callable[["Context"], Any] | None = None
+    data: Callable[["Context"], dict] | None = None
+    # Дорогие сценарии (bcrypt) прогоняются меньшим числом запросов
+    weight: float = 1.0
+
+
+@dataclass
+class Context:
+    """Сведения о засеянных данных, нужные для построения запросов."""
+
+    args: argparse.Namespace
+    headers: dict[str, dict[str, str]] = field(default_factory=dict)
+    refresh_claims: dict = field(default_factory=dict)
+    counter: int = 0
+
+    def next_id(self) -> int:
+        """Уникальный номер для создаваемых в бенчмарке сущностей."""
+        self.counter += 1
+        return self.counter
+
+    def refresh_token(self) -> str:
+        """Новый refresh-токен: использованный токен отзывается ротацией."""
+        from app.auth import create_refresh_token
+
+        return create_refresh_token(self.refresh_claims)
+
+    def product_id(self) -> int:
+        """Случайный ID засеянного товара."""
+        return random.randint(1, self.args.products)
+
+    def category_id(self) -> int:
+        """Случайный ID засеянной категории."""
+        return random.randint(1, self.args.categories)
+
+
+def _product_body(ctx: Context) -> dict:
+    return {
+        "name": f"Bench product {ctx.next_id()}",
+        "description": "Created by the benchmark",
+        "price": round(random.uniform(1, 1000), 2),
+        "stock": random.randint(0, 100),
+        "category_id": ctx.category_id(),
+    }
+
+
+SCENARIOS = [
+    Scenario("root", "GET", lambda ctx: "/"),
+    Scenario("categories.list", "GET", lambda ctx: "/categories/"),
+    Scenario(
+        "categories.subtree", "GET",
+        lambda ctx: f"/categories/{ctx.category_id()}/subtree",
+    ),
+    Scenario(
+        "categories.ancestors", "GET",
+        lambda ctx: f"/categories/{ctx.category_id()}/ancestors",
+    ),
+    Scenario(
+        "categories.products", "GET",
+        lambda ctx: f"/categories/{ctx.category_id()}/products",
+    ),
+    Scenario(
+        "categories.create", "POST", lambda ctx: "/categories/",
+        json=lambda ctx: {"name": f"Bench category {ctx.next_id()}"},
+    ),
+    Scenario("products.list", "GET", lambda ctx: "/products/"),
+    Scenario(
+        "products.list_by_price", "GET", lambda ctx: "/products/",
+        params=lambda ctx: {
+            "sort": "price",
+            "min_price": 100,
+            "max_price": 500,
+            "in_stock": True,
+        },
+    ),
+    Scenario(
+        "products.get", "GET",
+        lambda ctx: f"/products/{ctx.product_id()}",
+    ),
+    Scenario(
+        "products.create", "POST", lambda ctx: "/products/",
+        role="seller", json=_product_body,
+    ),
+    Scenario(
+        "products.update", "PUT",
+        lambda ctx: f"/products/{ctx.product_id()}",
+        role="seller", json=_product_body,
+    ),
+    Scenario(
+        "reviews.list", "GET", lambda ctx: "/reviews/",
+        params=lambda ctx: {"limit": 100},
+    ),
+    Scenario(
+        "reviews.for_product", "GET",
+        lambda ctx: f"/products/{ctx.product_id()}/reviews/",
+    ),
+    Scenario(
+        "reviews.create", "POST", lambda ctx: "/reviews/",
+        role="buyer",
+        json=lambda ctx: {
+            "product_id": ctx.product_id(),
+            "comment": "Benchmark review",
+            "grade": random.randint(1, 5),
+        },
+    ),
+    Scenario(
+        "users.create", "POST", lambda ctx: "/users/",
+        json=lambda ctx: {
+            "email": f"bench-new-{ctx.next_id()}@example.com",
+            "password": PASSWORD,
+        },
+        weight=0.05,
+    ),
+    Scenario(
+        "users.token", "POST", lambda ctx: "/users/token",
+        data=lambda ctx: {"username": "buyer@example.com",
+                          "password": PASSWORD},
+        weight=0.05,
+    ),
+    Scenario(
+        "users.refresh_token", "POST", lambda ctx: "/users/refresh-token",
+        params=lambda ctx: {"refresh_token": ctx.refresh_token()},
+    ),
+    Scenario(
+        "internal.pool", "GET", lambda ctx: "/internal/pool",
+        role="internal",
+    ),
+    Scenario(
+        "internal.metrics", "GET", lambda ctx: "/metrics",
+        role="internal",
+    ),
+]
+
+
+async def seed(args: argparse.Namespace) -> None:
+    """Создаёт схему и заполняет базу тестовыми данными."""
+    from sqlalchemy import insert
+
+    from app.auth import hash_password
+    from app.database import Base, async_engine
+    from app.models import Category, Product, Review, User
+
+    rng = random.Random(args.seed)
+    hashed = hash_password(PASSWORD)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        users = [
+            {"email": f"{role}@example.com", "hashed_password": hashed,
+             "role": role}
+            for role in ("seller", "buyer", "admin")
+        ]
+        users += [
+            {"email": f"user{i}@example.com", "hashed_password": hashed,
+             "role": rng.choice(("buyer", "seller"))}
+            for i in range(max(args.users - len(users), 0))
+        ]
+        await conn.execute(insert(User), users)
+        # Дерево категорий: каждая следующая цепляется к случайной ранней
+        paths: dict[int, str] = {}
+        categories = []
+        for category_id in range(1, args.categories + 1):
+            parent_id = None
+            if category_id > 5 and rng.random() < 0.8:
+                parent_id = rng.randint(1, category_id - 1)
+            paths[category_id] = (
+                f"{paths.get(parent_id, '')}{category_id}/"
+            )
+            categories.append({
+                "name": f"Category {category_id}",
+                "parent_id": parent_id,
+                "path": paths[category_id],
+            })
+        await conn.execute(insert(Category), categories)
+        ratings = [[0, 0] for _ in range(args.products + 1)]
+        reviews = []
+        for _ in range(args.reviews):
+            product_id = rng.randint(1, args.products)
+            grade = rng.randint(1, 5)
+            ratings[product_id][0] += 1
+            ratings[product_id][1] += grade
+            reviews.append({
+                "user_id": 2,
+                "product_id": product_id,
+                "comment": "Seeded review",
+                "grade": grade,
+            })
+        products = [
+            {
+                "name": f"Product {product_id}",
+                "description": f"Description of product {product_id}",
+                "price": round(rng.uniform(1, 1000), 2),
+                "stock": rng.randint(0, 100),
+                "category_id": rng.randint(1, args.categories),
+                "seller_id": 1,
+                "review_count": ratings[product_id][0],
+                "rating_sum": ratings[product_id][1],
+                "rating": (
+                    ratings[product_id][1] / ratings[product_id][0]
+                    if ratings[product_id][0] else 0
+                ),
+            }
+            for product_id in range(1, args.products + 1)
+        ]
+        for table, rows in ((Product, products), (Review, reviews)):
+            for start in range(0, len(rows), 5000):
+                await conn.execute(insert(table), rows[start:start + 5000])
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+async def run_scenario(
+    client: Any,
+    scenario: Scenario,
+    ctx: Context,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """Прогоняет сценарий и возвращает статистику задержек."""
+    latencies: list[float] = []
+    errors = 0
+    remaining = max(int(requests * scenario.weight), 1)
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.request(
+                scenario.method,
+                scenario.path(ctx),
+                params=scenario.params(ctx) if scenario.params else None,
+                json=scenario.json(ctx) if scenario.json else None,
+                data=scenario.data(ctx) if scenario.data else None,
+                headers=ctx.headers.get(scenario.role),
+            )
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Засевает базу и прогоняет выбранные сценарии."""
+    import httpx
+
+    from app.auth import create_access_token
+    from app.config import INTERNAL_TOKEN
+    from app.database import async_engine
+    from app.main import app
+
+    if not args.skip_seed:
+        await seed(args)
+    ctx = Context(args=args)
+    for user_id, role in enumerate(("seller", "buyer", "admin"), start=1):
+        claims = {"sub": f"{role}@example.com", "role": role, "id": user_id}
+        ctx.headers[role] = {
+            "Authorization": f"Bearer {create_access_token(claims)}"
+        }
+        if role == "buyer":
+            ctx.refresh_claims = claims
+    ctx.headers["internal"] = {"Authorization": f"Bearer {INTERNAL_TOKEN}"}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://benchmark",
+    ) as client:
+        for scenario in SCENARIOS:
+            if args.only and not any(
+                scenario.name.startswith(prefix) for prefix in args.only
+            ):
+                continue
+            results[scenario.name] = await run_scenario(
+                client, scenario, ctx, args.requests, args.concurrency
+            )
+            _print_row(scenario.name, results[scenario.name])
+    await async_engine.dispose()
+    return results
+
+
+def _print_row(name: str, stats: dict, baseline: dict | None = None) -> None:
+    row = (
+        f"{name:<28} {stats['rps']:>9.1f} rps  p50 {stats['p50_ms']:>8.2f}"
+        f"  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms"
+        f"  errors {stats['errors']}"
+    )
+    if baseline:
+        delta = (stats["p95_ms"] / baseline["p95_ms"] - 1) * 100
+        row += f"  p95 {delta:+.1f}%"
+    print(row)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, check=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=500,
+                        help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*",
+                        help="префиксы имён сценариев, например products.")
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="использовать уже заполненную базу")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path,
+                        help="JSON прошлого запуска для сравнения")
+    args = parser.parse_args()
+
+    database_url = args.database_url or "sqlite+aiosqlite:///{}".format(
+        Path(tempfile.gettempdir()) / "ecommerce_benchmark.db"
+    )
+    # Настройки читаются при импорте app.config, поэтому задаём их заранее
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789")
+    os.environ.setdefault("DB_POOL_SIZE", str(args.concurrency))
+    os.environ.setdefault("INTERNAL_TOKEN", "benchmark-internal-token")
+    # Сценарий users.token измеряет сам вход, а не ограничение попыток
+    for name in ("LOGIN_IP", "LOGIN_USER"):
+        os.environ.setdefault(f"{name}_PER_MINUTE", "1000000")
+        os.environ.setdefault(f"{name}_BURST", "1000000")
+    random.seed(args.seed)
+
+    commit = _git_commit()
+    results = asyncio.run(run(args))
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": database_url.split("://", 1)[0],
+        "config": {
+            name: getattr(args, name)
+            for name in ("users", "categories", "products", "reviews",
+                         "requests", "concurrency", "seed")
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        print(f"\nCompared with {args.compare}:")
+        for name, stats in results.items():
+            _print_row(name, stats, baseline.get(name))
+
+
+if __name__ == "__main__":
+    main()
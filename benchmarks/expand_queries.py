@@ -0,0 +1,131 @@
+"""Проверка числа SQL-запросов на раскрытие связей (?expand=).
+
+Засевает временную SQLite-базу и для каждого эндпоинта с expand
+считает запросы к базе при разных размерах страницы. С selectinload
+число запросов не должно зависеть от размера страницы; если зависит,
+скрипт завершается с ненулевым кодом (N+1).
+
+Запуск::
+
+    python -m benchmarks.expand_queries --sizes 1 10 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from typing import Callable
+
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789")
+os.environ.setdefault(
+    "LOG_FILE", os.path.join(tempfile.mkdtemp(), "bench.log")
+)
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "expand.db"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.database import Base, async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Category, Product, User  # noqa: E402
+
+CATEGORIES = 20
+
+# Эндпоинт: запрос (путь, параметры) для страницы из size элементов
+SCENARIOS: dict[str, Callable[[int], tuple[str, dict]]] = {
+    "products": lambda size: (
+        "/products/",
+        {"limit": size, "expand": "category,seller"},
+    ),
+    "products.batch": lambda size: (
+        "/products/batch",
+        {"ids": list(range(1, size + 1)), "expand": "category,seller"},
+    ),
+    "categories.products": lambda size: (
+        "/categories/1/products",
+        {"limit": size, "expand": "category,seller"},
+    ),
+    # Поддерево категории k в цепочке из CATEGORIES содержит
+    # CATEGORIES - k + 1 категорий
+    "categories.subtree": lambda size: (
+        f"/categories/{max(CATEGORIES - size + 1, 1)}/subtree",
+        {"expand": "parent,children"},
+    ),
+}
+
+
+async def _seed(products: int) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": f"seller{i}@example.com", "hashed_password": "x",
+             "role": "seller"}
+            for i in range(1, 11)
+        ])
+        # Цепочка категорий 1/2/.../CATEGORIES, товары раскиданы по всем
+        await conn.execute(insert(Category), [
+            {
+                "id": i,
+                "name": f"Category {i}",
+                "parent_id": i - 1 or None,
+                "path": "".join(f"{j}/" for j in range(1, i + 1)),
+            }
+            for i in range(1, CATEGORIES + 1)
+        ])
+        await conn.execute(insert(Product), [
+            {
+                "name": f"Product {i}",
+                "price": 10,
+                "stock": 1,
+                "category_id": i % CATEGORIES + 1,
+                "seller_id": i % 10 + 1,
+            }
+            for i in range(1, products + 1)
+        ])
+
+
+async def _run(sizes: list[int]) -> bool:
+    await _seed(max(sizes))
+    statements = 0
+
+    def count(*args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    constant = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark"
+    ) as client:
+        for name, scenario in SCENARIOS.items():
+            counts = []
+            for size in sizes:
+                path, params = scenario(size)
+                statements = 0
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+                counts.append(statements)
+            ok = len(set(counts)) == 1
+            constant = constant and ok
+            row = "  ".join(
+                f"{size}: {queries}" for size, queries in zip(sizes, counts)
+            )
+            print(f"{name:<22} {row}  {'ok' if ok else 'GROWS'}")
+    await async_engine.dispose()
+    return constant
+
+
+def main() -> None:
+    """Точка входа проверки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    if not asyncio.run(_run(args.sizes)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Микробенчмарк накладных расходов RequestLoggingMiddleware на запрос.
+
+Сравнивает пустое ASGI-приложение с тем же приложением под middleware
+журнала при разных долях выборки. Лог пишется во временный файл.
+
+Запуск::
+
+    python -m benchmarks.logging_overhead --requests 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789")
+os.environ.setdefault(
+    "LOG_FILE", os.path.join(tempfile.mkdtemp(), "bench.log")
+)
+
+from loguru import logger  # noqa: E402
+
+from app.request_logging import (  # noqa: E402
+    RequestLoggingMiddleware,
+    configure_logging,
+)
+from benchmarks.metrics_overhead import (  # noqa: E402
+    _empty_app,
+    _measure,
+)
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+    configure_logging()
+    bare = asyncio.run(_measure(_empty_app, args.requests))
+    print(f"bare app:          {bare:6.2f} us/request")
+    for rate in (0.0, 0.01, 0.1, 1.0):
+        app = RequestLoggingMiddleware(_empty_app, sample_rate=rate)
+        wrapped = asyncio.run(_measure(app, args.requests))
+        print(
+            f"sample rate {rate:<5}: {wrapped:6.2f} us/request "
+            f"(+{wrapped - bare:.2f})"
+        )
+    logger.remove()
+    print(f"log file: {os.environ['LOG_FILE']}")
+
+
+if __name__ == "__main__":
+    main()
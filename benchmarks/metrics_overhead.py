@@ -0,0 +1,59 @@
+"""Микробенчмарк накладных расходов MetricsMiddleware на один запрос.
+
+Сравнивает пустое ASGI-приложение с тем же приложением под middleware.
+
+Запуск::
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from starlette.types import Receive, Scope, Send
+
+from app.metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/bench/{item_id}"
+
+
+async def _empty_app(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message: dict) -> None:
+    return None
+
+
+async def _measure(app: object, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/bench/1"}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), _receive, _send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+    bare = asyncio.run(_measure(_empty_app, args.requests))
+    wrapped = asyncio.run(
+        _measure(MetricsMiddleware(_empty_app), args.requests)
+    )
+    print(f"bare app:     {bare:6.2f} us/request")
+    print(f"with metrics: {wrapped:6.2f} us/request")
+    print(f"overhead:     {wrapped - bare:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Микробенчмарк: задержка остального API во время параллельных логинов.
+
+Сравнивает синхронный bcrypt в обработчике с вынесенным в пул потоков.
+Пока идут проверки паролей, по ASGI-приложению бьёт пробный GET /.
+
+Запуск::
+
+    python -m benchmarks.password_hashing --logins 8 --probes 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+
+from app.auth import hash_password, verify_password, verify_password_async
+from app.main import app
+
+
+async def _asgi_get(path: str) -> int:
+    """Выполняет GET напрямую через ASGI-интерфейс и возвращает статус."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    status_code = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def _probe(count: int, interval: float) -> list[float]:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await _asgi_get("/")
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def _blocking_login(password: str, hashed: str) -> None:
+    await asyncio.sleep(0)
+    verify_password(password, hashed)
+
+
+async def _offloaded_login(password: str, hashed: str) -> None:
+    await verify_password_async(password, hashed)
+
+
+async def _run(
+    login: Callable[[str, str], Awaitable[None]],
+    logins: int,
+    probes: int,
+) -> list[float]:
+    hashed = hash_password("benchmark-password")
+    probe = asyncio.create_task(_probe(probes, 0.005))
+    await asyncio.gather(
+        *(login("benchmark-password", hashed) for _ in range(logins))
+    )
+    return await probe
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>10}: p50={statistics.median(latencies):8.2f} ms "
+        f"p99={p99:8.2f} ms max={latencies[-1]:8.2f} ms"
+    )
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--probes", type=int, default=100)
+    args = parser.parse_args()
+    for name, login in (
+        ("blocking", _blocking_login),
+        ("offloaded", _offloaded_login),
+    ):
+        _report(name, asyncio.run(_run(login, args.logins, args.probes)))
+
+
+if __name__ == "__main__":
+    main()
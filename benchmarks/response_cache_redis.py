@@ -0,0 +1,114 @@
+"""Проверка кэша ответов на Redis-бэкенде.
+
+Засевает временную SQLite-базу, подключает кэш ответов к Redis по
+--redis-url и для каждого кэшируемого эндпоинта делает два одинаковых
+запроса. Второй должен отдаваться из кэша без единого SQL-запроса;
+если нет, скрипт завершается с ненулевым кодом. Ключи пишутся под
+отдельным префиксом и удаляются после проверки.
+
+Запуск::
+
+    python -m benchmarks.response_cache_redis --redis-url redis://localhost
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789")
+os.environ.setdefault(
+    "LOG_FILE", os.path.join(tempfile.mkdtemp(), "bench.log")
+)
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "response_cache.db"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.database import Base, async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Category, Product, User  # noqa: E402
+from app.response_cache import RedisCacheBackend, response_cache  # noqa: E402
+
+PREFIX = f"response_cache_check:{os.getpid()}"
+
+# Кэшируемые эндпоинты: путь и параметры запроса. У фасетов нет тегов
+SCENARIOS: dict[str, tuple[str, dict]] = {
+    "categories": ("/categories/", {}),
+    "products.facets": ("/products/facets", {}),
+    "products.facets.filtered": ("/products/facets", {"category_id": 1}),
+    "product.reviews": ("/products/1/reviews/", {}),
+}
+
+
+async def _seed() -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": "seller@example.com", "hashed_password": "x",
+             "role": "seller"},
+        ])
+        await conn.execute(insert(Category), [
+            {"id": 1, "name": "Category 1", "path": "1/"},
+        ])
+        await conn.execute(insert(Product), [
+            {"name": f"Product {i}", "price": i, "stock": i % 3,
+             "category_id": 1, "seller_id": 1}
+            for i in range(1, 21)
+        ])
+
+
+async def _run(redis_url: str) -> bool:
+    import redis.asyncio
+
+    client = redis.asyncio.from_url(redis_url)
+    response_cache.backend = RedisCacheBackend(client, prefix=PREFIX)
+    await _seed()
+    statements = 0
+
+    def count(*args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    cached = True
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as http:
+            for name, (path, params) in SCENARIOS.items():
+                counts = []
+                for _ in range(2):
+                    statements = 0
+                    response = await http.get(path, params=params)
+                    response.raise_for_status()
+                    counts.append(statements)
+                ok = counts[1] == 0
+                cached = cached and ok
+                print(
+                    f"{name:<26} miss: {counts[0]}  hit: {counts[1]}  "
+                    f"{'ok' if ok else 'NOT CACHED'}"
+                )
+    finally:
+        keys = [key async for key in client.scan_iter(f"{PREFIX}:*")]
+        if keys:
+            await client.delete(*keys)
+        await client.aclose()
+        await async_engine.dispose()
+    return cached
+
+
+def main() -> None:
+    """Точка входа проверки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    args = parser.parse_args()
+    if not asyncio.run(_run(args.redis_url)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
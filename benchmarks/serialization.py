@@ -0,0 +1,129 @@
+"""Бенчмарк стоимости сериализации списка отзывов на один элемент.
+
+Сравнивает два пути ответа на одних и тех же данных:
+
+* orm - ORM-объекты, проверка через response_model с from_attributes и
+  jsonable-кодирование FastAPI, затем JSONResponse (как было раньше);
+* fast - выборка колонок в словари, готовый TypeAdapter и
+  JSONBytesResponse (app.serialization).
+
+Время считается вместе с выборкой из SQLite в памяти, отдельно
+показывается доля самой сериализации.
+
+Запуск::
+
+    python -m benchmarks.serialization --items 5000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.models.reviews import Review  # noqa: E402
+from app.schemas import ReviewResponse  # noqa: E402
+from app.serialization import (  # noqa: E402
+    JSONBytesResponse,
+    dump_json,
+    row_dicts,
+    schema_columns,
+)
+
+response_field = create_model_field(
+    name="response", type_=list[ReviewResponse], mode="serialization"
+)
+review_list_adapter = TypeAdapter(list[ReviewResponse])
+
+
+async def _orm_path(db: AsyncSession) -> tuple[bytes, float]:
+    rows = (await db.scalars(select(Review))).all()
+    started = time.perf_counter()
+    content = await serialize_response(
+        field=response_field, response_content=rows
+    )
+    body = JSONResponse(content).body
+    return body, time.perf_counter() - started
+
+
+async def _fast_path(db: AsyncSession) -> tuple[bytes, float]:
+    rows = row_dicts(
+        await db.execute(select(*schema_columns(ReviewResponse, Review)))
+    )
+    started = time.perf_counter()
+    body = JSONBytesResponse(dump_json(review_list_adapter, rows)).body
+    return body, time.perf_counter() - started
+
+
+async def _measure(
+    session_maker: async_sessionmaker,
+    path: Callable[[AsyncSession], Awaitable[tuple[bytes, float]]],
+    repeat: int,
+) -> tuple[float, float, Any]:
+    total = serialize = 0.0
+    body = b""
+    for _ in range(repeat):
+        # Новая сессия на каждый прогон, чтобы identity map не кэшировала
+        # объекты между повторами
+        async with session_maker() as db:
+            started = time.perf_counter()
+            body, spent = await path(db)
+            total += time.perf_counter() - started
+            serialize += spent
+    return total / repeat, serialize / repeat, body
+
+
+async def _run(items: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Review.__table__.create)
+        await conn.execute(insert(Review), [
+            {
+                "user_id": 1,
+                "product_id": i % 100 + 1,
+                "comment": f"Benchmark review number {i}",
+                "comment_date": datetime(2026, 1, 1),
+                "grade": i % 5 + 1,
+                "is_active": True,
+            }
+            for i in range(items)
+        ])
+    results = {}
+    for name, path in (("orm", _orm_path), ("fast", _fast_path)):
+        await _measure(session_maker, path, 1)
+        results[name] = await _measure(session_maker, path, repeat)
+    await engine.dispose()
+    assert results["orm"][2] == results["fast"][2], "bodies differ"
+    for name, (total, serialize, _) in results.items():
+        print(
+            f"{name:5} total {total / items * 1e6:7.2f} us/item, "
+            f"serialization {serialize / items * 1e6:7.2f} us/item"
+        )
+    print(f"speedup: {results['orm'][0] / results['fast'][0]:.1f}x total")
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_run(args.items, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Бенчмарк холодного старта: импорт, lifespan и первые запросы.
+
+Каждый режим запускается в отдельном процессе, чтобы импорт и кэши
+были по-настоящему холодными. В процессе замеряются импорт app.main,
+старт lifespan (с прогревом или без) и задержка первого запроса к
+каждому горячему маршруту против медианы установившегося режима.
+
+Запуск::
+
+    python -m benchmarks.startup --products 2000
+    python -m benchmarks.startup --database-url postgresql+asyncpg://...
+
+Для Postgres нужна пустая база: схема пересоздаётся.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STEADY_REQUESTS = 20
+
+
+async def _seed(products: int) -> None:
+    from sqlalchemy import insert
+
+    from app.database import Base, async_engine
+    from app.models import Category, Product, User
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": "seller@example.com", "hashed_password": "x",
+             "role": "seller"},
+        ])
+        await conn.execute(insert(Category), [
+            {"name": "Category", "path": "1/"},
+        ])
+        await conn.execute(insert(Product), [
+            {"name": f"Product {i}", "price": i, "stock": 1,
+             "category_id": 1, "seller_id": 1}
+            for i in range(1, products + 1)
+        ])
+    await async_engine.dispose()
+
+
+async def _child(products: int) -> dict:
+    """Замеры внутри холодного процесса."""
+    await _seed(products)
+    started = time.perf_counter()
+    import httpx
+
+    from app.main import app
+    from app.warmup import HOT_REQUESTS
+
+    imported = time.perf_counter()
+    result = {"import_ms": (imported - started) * 1000, "routes": {}}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        result["lifespan_ms"] = (time.perf_counter() - imported) * 1000
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            for path, params in HOT_REQUESTS:
+                latencies = []
+                for _ in range(STEADY_REQUESTS + 1):
+                    request_started = time.perf_counter()
+                    await client.get(path, params=params)
+                    latencies.append(
+                        (time.perf_counter() - request_started) * 1000
+                    )
+                result["routes"][path] = {
+                    "first_ms": latencies[0],
+                    "steady_ms": statistics.median(latencies[1:]),
+                }
+    return result
+
+
+def _run_mode(args: argparse.Namespace, warmup: bool) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        WARMUP_ENABLED="1" if warmup else "0",
+        LOG_FILE=os.path.join(tempfile.mkdtemp(), "bench.log"),
+    )
+    env.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child",
+         "--products", str(args.products)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(_child(args.products))))
+        return
+    if args.database_url is None:
+        args.database_url = "sqlite+aiosqlite:///" + os.path.join(
+            tempfile.mkdtemp(), "startup.db"
+        )
+    for warmup in (False, True):
+        result = _run_mode(args, warmup)
+        print(
+            f"warm-up {'on ' if warmup else 'off'}: "
+            f"import {result['import_ms']:7.1f} ms, "
+            f"lifespan {result['lifespan_ms']:7.1f} ms"
+        )
+        for path, stats in result["routes"].items():
+            print(
+                f"    {path:<24} first {stats['first_ms']:7.2f} ms  "
+                f"steady {stats['steady_ms']:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()